@@ -3,6 +3,7 @@ import pandas as pd
 import json
 import os
 from scheme_qa import SchemeQASystem  # Import our QA system
+from translation import Translator  # Offline, cached translation
 
 # Set page configuration
 st.set_page_config(
@@ -58,14 +59,10 @@ st.markdown("""
 def load_qa_system():
     return SchemeQASystem()
 
-# Function to translate text using Google Translate API
-def translate_text(text, target_language="hi"):
-    # In a real implementation, you'd use Google Translate API or another service
-    # For demonstration, we're using a placeholder function
-    if target_language == "hi" and text:
-        # This is just a placeholder. In a real application, we'd use a proper translation API
-        return f"[Translated to Hindi]: {text}"
-    return text
+# Function to load the local translation model and its persistent cache
+@st.cache_resource
+def load_translator():
+    return Translator()
 
 # Main application
 def main():
@@ -94,28 +91,30 @@ def main():
     if st.button("Search", type="primary"):
         if query:
             with st.spinner("Searching for relevant schemes..."):
-                # Get answer from QA system
-                result = qa_system.answer_query(query)
+                # Get answer from QA system, using the Hindi shard when one is loaded
+                shards = ["hi"] if language == "Hindi" and "hi" in qa_system.shards else None
+                result = qa_system.answer_query(query, shards=shards)
                 
                 # Display answer
                 st.markdown("### Answer")
                 answer = result["answer"]
+                schemes = result["relevant_schemes"]
                 
-                # Translate if Hindi is selected
+                # Translate if Hindi is selected: the answer and every card field
+                # go to the model in one batch, and precomputed cards come from the cache
                 if language == "Hindi":
-                    answer = translate_text(answer, "hi")
+                    answer, schemes = load_translator().translate_response(answer, schemes, "hi")
                 
                 st.markdown(f"<div class='scheme-card'>{answer}</div>", unsafe_allow_html=True)
                 
                 # Display relevant schemes
                 st.markdown("### Relevant Schemes")
                 
-                for scheme in result["relevant_schemes"]:
-                    # Translate if Hindi is selected
-                    scheme_name = translate_text(scheme["name"], "hi") if language == "Hindi" else scheme["name"]
-                    scheme_desc = translate_text(scheme["description"], "hi") if language == "Hindi" else scheme["description"]
-                    scheme_ministry = translate_text(scheme["ministries"], "hi") if language == "Hindi" else scheme["ministries"]
-                    scheme_beneficiaries = translate_text(scheme["beneficiaries"], "hi") if language == "Hindi" else scheme["beneficiaries"]
+                for scheme in schemes:
+                    scheme_name = scheme["name"]
+                    scheme_desc = scheme["description"]
+                    scheme_ministry = scheme["ministries"]
+                    scheme_beneficiaries = scheme["beneficiaries"]
                     
                     # Display scheme card
                     st.markdown(f"""
@@ -146,8 +145,8 @@ def main():
     ]
     
     if language == "Hindi":
-        # Translate example queries (in a real app, these would be properly translated)
-        examples = [translate_text(ex, "hi") for ex in examples]
+        # Translate example queries in one batch (cached after the first run)
+        examples = load_translator().translate_batch(examples, "hi")
     
     for example in examples:
         if st.sidebar.button(example):
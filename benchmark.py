@@ -0,0 +1,281 @@
+"""Reproducible benchmarks for processing, index build, retrieval and generation.
+
+Builds a synthetic corpus of configurable size from all_schemes_final.json,
+times each stage with fixed seeds and writes machine-readable JSON so runs can
+be compared over time:
+
+    python benchmark.py --schemes 500 --output bench_results/run.json
+    python benchmark.py --schemes 2000 --skip-generation
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from data_processor import SchemeDataProcessor, normalize_scheme_record
+from text_resources import sent_tokenize
+
+DEFAULT_QUERIES = [
+    "What schemes are available for farmers in Maharashtra?",
+    "Are there any schemes for women entrepreneurs?",
+    "What schemes provide financial assistance for education?",
+    "How can senior citizens benefit from government schemes?",
+    "What schemes help with affordable housing?"
+]
+
+# Fields whose sentences are reshuffled between synthetic schemes
+_MIXED_FIELDS = ("description", "eligibility_criteria", "benefits", "application_process")
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        import torch
+        torch.manual_seed(seed)
+    except ImportError:
+        pass
+
+
+def build_synthetic_corpus(source_file="all_schemes_final.json", n_schemes=100, seed=0):
+    """Build n_schemes synthetic schemes by recombining sentences of real ones.
+
+    Every synthetic scheme starts from one real scheme and swaps in shuffled
+    sentences from others, so the corpus grows without being a pile of exact
+    copies. The same seed always gives the same corpus.
+    """
+    with open(source_file, 'r', encoding='utf-8') as f:
+        base = [normalize_scheme_record(record) for record in json.load(f)]
+    if not base:
+        raise ValueError(f"No schemes found in {source_file}")
+
+    rng = random.Random(seed)
+    sentence_pool = {field: [s for scheme in base for s in sent_tokenize(scheme.get(field, ''))]
+                     for field in _MIXED_FIELDS}
+    corpus = []
+    for i in range(n_schemes):
+        template = base[i % len(base)]
+        scheme = dict(template)
+        scheme["id"] = f"{template['id']}-{i}"
+        scheme["name"] = f"{template['name']} {i}"
+        for field in _MIXED_FIELDS:
+            own = sent_tokenize(template.get(field, ''))
+            pool = sentence_pool[field]
+            borrowed = rng.sample(pool, min(len(pool), max(1, len(own) // 2))) if pool else []
+            sentences = own + borrowed
+            rng.shuffle(sentences)
+            scheme[field] = " ".join(sentences)
+        corpus.append(scheme)
+    return corpus
+
+
+def percentiles(samples):
+    samples = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "n": int(len(samples)),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99))
+    }
+
+
+def bench_processing(input_file, workdir, deduplicate=True):
+    """Time each SchemeDataProcessor stage and write the processed files"""
+    processor = SchemeDataProcessor(input_file)
+    timings = {}
+
+    start = time.perf_counter()
+    processor.extract_key_info()
+    timings["extract_key_info_s"] = time.perf_counter() - start
+
+    # Always refit so the persisted keyword model doesn't hide the fit cost
+    start = time.perf_counter()
+    processor.extract_keywords(model_file=False, refit=True)
+    timings["extract_keywords_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    processor.create_chunks()
+    timings["create_chunks_s"] = time.perf_counter() - start
+
+    if deduplicate:
+        start = time.perf_counter()
+        processor.deduplicate()
+        timings["deduplicate_s"] = time.perf_counter() - start
+        timings["dedup"] = processor.dedup_stats
+
+    timings["total_s"] = sum(v for k, v in timings.items() if k.endswith("_s"))
+    timings["schemes"] = len(processor.processed_data)
+    timings["chunks"] = len(processor.chunks)
+
+    processed_file = os.path.join(workdir, "processed_schemes.json")
+    chunks_file = os.path.join(workdir, "scheme_chunks.json")
+    processor.save_processed_data(processed_file)
+    processor.save_chunks(chunks_file)
+    return timings, processed_file, chunks_file
+
+
+def bench_index_build(qa_system):
+    chunks = qa_system.shards.get("default").chunks
+    start = time.perf_counter()
+    qa_system._build_vector_db(chunks)
+    return {"build_s": time.perf_counter() - start, "chunks": len(chunks)}
+
+
+def bench_retrieval(qa_system, queries, repeats=5, top_k=5):
+    # Warm up once so model/first-call overheads don't land in the percentiles
+    qa_system.retrieve_relevant_chunks(queries[0], top_k)
+    samples = []
+    cached_samples = []
+    for _ in range(repeats):
+        for query in queries:
+            # Cold: clear the query embedding cache so the full encode is timed
+            qa_system.query_cache.clear()
+            start = time.perf_counter()
+            qa_system.retrieve_relevant_chunks(query, top_k)
+            samples.append(time.perf_counter() - start)
+            # Warm: the same query again, served from the cache
+            start = time.perf_counter()
+            qa_system.retrieve_relevant_chunks(query, top_k)
+            cached_samples.append(time.perf_counter() - start)
+    result = percentiles(samples)
+    result["queries_per_s"] = len(samples) / sum(samples)
+    result["cached"] = percentiles(cached_samples)
+    return result
+
+
+def bench_generation(qa_system, queries, seed=0, do_sample=True):
+    from metrics import RequestTrace
+
+    runs = []
+    for query in queries:
+        seed_everything(seed)
+        trace = RequestTrace()
+        start = time.perf_counter()
+        qa_system.generate_answer(query, trace=trace, do_sample=do_sample)
+        elapsed = time.perf_counter() - start
+        values = trace.to_dict()
+        runs.append({
+            "latency_s": elapsed,
+            "generated_tokens": values.get("generated_tokens", 0),
+            "decode_tokens_per_second": values.get("decode_tokens_per_second", 0.0),
+            "prefill_ms": values["stages_ms"].get("prefill", 0.0),
+            "intent": values.get("intent"),
+            "max_new_tokens": values.get("max_new_tokens"),
+            "stop_reason": values.get("stop_reason")
+        })
+    return {
+        "runs": runs,
+        "mean_decode_tokens_per_second": float(np.mean([r["decode_tokens_per_second"] for r in runs])),
+        "mean_generated_tokens": float(np.mean([r["generated_tokens"] for r in runs])),
+        "mean_latency_s": float(np.mean([r["latency_s"] for r in runs]))
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def run_benchmarks(n_schemes=100, seed=0, source_file="all_schemes_final.json", repeats=5,
+                   skip_index=False, skip_generation=False, deduplicate=True, use_gpu=False,
+                   assisted_modes=("none",), greedy=False, compare_fixed_length=False):
+    seed_everything(seed)
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"schemes": n_schemes, "seed": seed, "source_file": source_file,
+                   "repeats": repeats, "deduplicate": deduplicate, "use_gpu": use_gpu,
+                   "assisted_modes": list(assisted_modes), "greedy": greedy,
+                   "compare_fixed_length": compare_fixed_length}
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_file = os.path.join(workdir, "synthetic_schemes.json")
+        with open(input_file, 'w', encoding='utf-8') as f:
+            json.dump(build_synthetic_corpus(source_file, n_schemes, seed), f, ensure_ascii=False)
+
+        print(f"Benchmarking processing of {n_schemes} synthetic schemes...")
+        results["processing"], processed_file, chunks_file = bench_processing(input_file, workdir, deduplicate)
+
+        if skip_index:
+            return results
+
+        # Imported lazily so processing-only runs don't need torch/faiss
+        from scheme_qa import SchemeQASystem
+        qa_system = SchemeQASystem(chunks_file=chunks_file, processed_data_file=processed_file,
+                                   use_gpu=use_gpu)
+        print("Benchmarking index build...")
+        results["index_build"] = bench_index_build(qa_system)
+        print("Benchmarking retrieval...")
+        results["retrieval"] = bench_retrieval(qa_system, DEFAULT_QUERIES, repeats)
+
+        if not skip_generation:
+            results["generation"] = {}
+            for mode in assisted_modes:
+                print(f"Benchmarking generation (assisted decoding: {mode})...")
+                qa_system.set_assisted_decoding(None if mode == "none" else mode)
+                results["generation"][mode] = bench_generation(qa_system, DEFAULT_QUERIES, seed,
+                                                               do_sample=not greedy)
+                if compare_fixed_length:
+                    # Same queries with only max_new_tokens, to measure what adaptive length saves
+                    adaptive_length, qa_system.adaptive_length = qa_system.adaptive_length, False
+                    fixed = bench_generation(qa_system, DEFAULT_QUERIES, seed, do_sample=not greedy)
+                    qa_system.adaptive_length = adaptive_length
+                    results["generation"][mode]["fixed_length"] = fixed
+                    results["generation"][mode]["mean_tokens_saved"] = (
+                        fixed["mean_generated_tokens"] - results["generation"][mode]["mean_generated_tokens"])
+                    results["generation"][mode]["latency_speedup_vs_fixed"] = (
+                        fixed["mean_latency_s"] / results["generation"][mode]["mean_latency_s"])
+            qa_system.set_assisted_decoding(None)
+            baseline = results["generation"].get("none")
+            if baseline and baseline["mean_decode_tokens_per_second"]:
+                for mode, result in results["generation"].items():
+                    result["speedup_vs_none"] = (result["mean_decode_tokens_per_second"]
+                                                 / baseline["mean_decode_tokens_per_second"])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MyScheme QA pipeline")
+    parser.add_argument("--schemes", type=int, default=100, help="Synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default="all_schemes_final.json", help="Real schemes to recombine")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the query set for retrieval")
+    parser.add_argument("--skip-index", action="store_true", help="Only benchmark processing")
+    parser.add_argument("--skip-generation", action="store_true", help="Skip the LLM benchmark")
+    parser.add_argument("--no-dedup", action="store_true", help="Skip near-duplicate removal")
+    parser.add_argument("--assisted-modes", default="none",
+                        help="Comma-separated generation modes: none, prompt_lookup, draft_model")
+    parser.add_argument("--greedy", action="store_true", help="Greedy baseline instead of sampling")
+    parser.add_argument("--compare-fixed-length", action="store_true",
+                        help="Also generate without adaptive length and report the tokens saved")
+    parser.add_argument("--gpu", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.schemes, args.seed, args.source, args.repeats, args.skip_index,
+                             args.skip_generation, not args.no_dedup, args.gpu,
+                             args.assisted_modes.split(","), args.greedy, args.compare_fixed_length)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
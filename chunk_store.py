@@ -0,0 +1,274 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tracemalloc
+import numpy as np
+from typing import List, Dict, Any, Iterator
+
+# Per-scheme metadata that every chunk of a scheme shares
+SCHEME_FIELDS = ("scheme_id", "scheme_name", "ministries", "beneficiaries", "tags")
+
+
+class ChunkView:
+    """Lightweight, read-only view of one chunk in a ChunkStore.
+
+    Supports the same ``chunk['text']`` / ``chunk.get('scheme_name')`` access as
+    the old chunk dicts, without copying any of the chunk's data.
+    """
+    __slots__ = ("_store", "index", "score")
+
+    def __init__(self, store, index: int, score: float = None):
+        self._store = store
+        self.index = index
+        self.score = score
+
+    def __getitem__(self, key):
+        if key == "text":
+            return self._store.text(self.index)
+        if key == "score":
+            if self.score is None:
+                raise KeyError(key)
+            return self.score
+        if key == "chunk_id":
+            return self.index
+        if key in SCHEME_FIELDS:
+            return self._store.scheme_field(self.index, key)
+        if key == "linked_scheme_ids":
+            return self._store.linked_scheme_ids(self.index)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = ["text", *SCHEME_FIELDS]
+        if self._store.linked_scheme_ids(self.index):
+            keys.append("linked_scheme_ids")
+        if self.score is not None:
+            keys.append("score")
+        return keys
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the view as a plain dict (e.g. for JSON serialization)"""
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        return f"ChunkView(index={self.index}, scheme_id={self['scheme_id']!r}, score={self.score})"
+
+
+class ChunkStore:
+    """Array-backed chunk storage.
+
+    All chunk texts live in one shared UTF-8 buffer addressed by a byte
+    offsets array, and each chunk points at its scheme through an integer
+    reference instead of holding its own copy of the scheme name, ministries,
+    beneficiaries and tags. The buffer and arrays can be saved to a directory
+    and memory-mapped read-only, so forked workers share a single copy.
+
+    A chunk that deduplication kept for several schemes also lists the other
+    schemes it stands in for (``linked_offsets`` / ``linked_refs``, CSR-style),
+    and counts as one of their chunks in ``chunk_ids_of``.
+    """
+
+    def __init__(self, buffer, offsets: np.ndarray, scheme_refs: np.ndarray,
+                 schemes: Dict[str, List[str]], linked_offsets: np.ndarray = None,
+                 linked_refs: np.ndarray = None):
+        self._buffer = buffer           # bytes or read-only mmap
+        self.offsets = offsets          # int64 byte offsets, len(chunks) + 1
+        self.scheme_refs = scheme_refs  # int32, len(chunks)
+        self.schemes = schemes          # field -> list indexed by scheme ref
+        if linked_offsets is None:
+            linked_offsets = np.zeros(len(scheme_refs) + 1, dtype=np.int64)
+            linked_refs = np.zeros(0, dtype=np.int32)
+        self.linked_offsets = linked_offsets  # int64, len(chunks) + 1
+        self.linked_refs = linked_refs        # int32 refs of the linked schemes
+        self._ref_lookup = {scheme_id: ref for ref, scheme_id in enumerate(schemes["scheme_id"])}
+        self._scheme_order = None
+        self._scheme_bounds = None
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> "ChunkStore":
+        """Build a store from the list-of-dicts format written by SchemeDataProcessor"""
+        schemes = {field: [] for field in SCHEME_FIELDS}
+        ref_lookup = {}
+        offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        scheme_refs = np.zeros(len(chunks), dtype=np.int32)
+        linked_offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        linked_refs = []
+        texts = []
+        position = 0
+
+        def scheme_ref(metadata):
+            scheme_id = metadata.get("scheme_id", "")
+            ref = ref_lookup.get(scheme_id)
+            if ref is None:
+                ref = len(schemes["scheme_id"])
+                ref_lookup[scheme_id] = ref
+                for field in SCHEME_FIELDS:
+                    schemes[field].append(metadata.get(field, ""))
+            return ref
+
+        for i, chunk in enumerate(chunks):
+            scheme_refs[i] = scheme_ref(chunk)
+            # Schemes whose duplicate chunks dedup merged into this one
+            linked_refs.extend(scheme_ref(linked) for linked in chunk.get("linked_schemes", ()))
+            linked_offsets[i + 1] = len(linked_refs)
+
+            text = chunk.get("text", "").encode("utf-8")
+            texts.append(text)
+            position += len(text)
+            offsets[i + 1] = position
+
+        return cls(b"".join(texts), offsets, scheme_refs, schemes,
+                   linked_offsets, np.array(linked_refs, dtype=np.int32))
+
+    @classmethod
+    def from_json(cls, filename: str) -> "ChunkStore":
+        """Load a chunks JSON file straight into a store"""
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls.from_chunks(json.load(f))
+
+    def save(self, directory: str):
+        """Write the store as flat files that load() can memory-map"""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "buffer.bin"), 'wb') as f:
+            f.write(self._buffer)
+        np.save(os.path.join(directory, "offsets.npy"), np.asarray(self.offsets))
+        np.save(os.path.join(directory, "scheme_refs.npy"), np.asarray(self.scheme_refs))
+        np.save(os.path.join(directory, "linked_offsets.npy"), np.asarray(self.linked_offsets))
+        np.save(os.path.join(directory, "linked_refs.npy"), np.asarray(self.linked_refs))
+        with open(os.path.join(directory, "schemes.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.schemes, f, ensure_ascii=False)
+        print(f"Chunk store saved to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, use_mmap=True) -> "ChunkStore":
+        """Load a saved store, memory-mapping the text buffer and arrays read-only"""
+        buffer_file = os.path.join(directory, "buffer.bin")
+        if use_mmap and os.path.getsize(buffer_file) > 0:
+            with open(buffer_file, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            with open(buffer_file, 'rb') as f:
+                buffer = f.read()
+        mmap_mode = 'r' if use_mmap else None
+        offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mmap_mode)
+        scheme_refs = np.load(os.path.join(directory, "scheme_refs.npy"), mmap_mode=mmap_mode)
+        with open(os.path.join(directory, "schemes.json"), 'r', encoding='utf-8') as f:
+            schemes = json.load(f)
+        linked_offsets = linked_refs = None
+        # Stores saved before chunk linking have no linked arrays
+        if os.path.exists(os.path.join(directory, "linked_offsets.npy")):
+            linked_offsets = np.load(os.path.join(directory, "linked_offsets.npy"), mmap_mode=mmap_mode)
+            linked_refs = np.load(os.path.join(directory, "linked_refs.npy"))
+        return cls(buffer, offsets, scheme_refs, schemes, linked_offsets, linked_refs)
+
+    @classmethod
+    def open(cls, path: str) -> "ChunkStore":
+        """Open either a saved store directory or a chunks JSON file"""
+        return cls.load(path) if os.path.isdir(path) else cls.from_json(path)
+
+    def __len__(self):
+        return len(self.scheme_refs)
+
+    def __getitem__(self, index: int) -> ChunkView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return ChunkView(self, index)
+
+    def __iter__(self) -> Iterator[ChunkView]:
+        for i in range(len(self)):
+            yield ChunkView(self, i)
+
+    def view(self, index: int, score: float = None) -> ChunkView:
+        """Return a result view for a chunk, optionally carrying a search score"""
+        return ChunkView(self, int(index), score)
+
+    def text(self, index: int) -> str:
+        return self._buffer[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def texts(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self.text(i)
+
+    def scheme_field(self, index: int, field: str):
+        return self.schemes[field][self.scheme_refs[index]]
+
+    def content_hash(self) -> str:
+        """SHA-256 of the chunk texts and boundaries, to tell whether a saved index still matches"""
+        digest = hashlib.sha256(self._buffer)
+        digest.update(np.ascontiguousarray(self.offsets, dtype=np.int64).tobytes())
+        return digest.hexdigest()
+
+    def linked_scheme_ids(self, index: int) -> List[str]:
+        """Other schemes whose duplicate chunks were merged into this one"""
+        refs = self.linked_refs[self.linked_offsets[index]:self.linked_offsets[index + 1]]
+        return [self.schemes["scheme_id"][ref] for ref in refs]
+
+    def scheme_ref_of(self, scheme_id: str) -> int:
+        """Return the integer scheme reference for a scheme id, or -1"""
+        return self._ref_lookup.get(scheme_id, -1)
+
+    def chunk_ids_of(self, scheme_id: str) -> np.ndarray:
+        """Positions of all chunks belonging or linked to a scheme (empty if it has none here)"""
+        ref = self.scheme_ref_of(scheme_id)
+        if ref < 0:
+            return np.zeros(0, dtype=np.int64)
+        if self._scheme_order is None:
+            # Group chunk positions by scheme ref once: CSR-style order + bounds.
+            # Linked chunks are listed again under each scheme they stand in for.
+            positions = np.concatenate([
+                np.arange(len(self), dtype=np.int64),
+                np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.linked_offsets))
+            ])
+            refs = np.concatenate([np.asarray(self.scheme_refs), np.asarray(self.linked_refs)])
+            order = np.argsort(refs, kind="stable")
+            self._scheme_order = positions[order]
+            sorted_refs = refs[order]
+            self._scheme_bounds = np.searchsorted(sorted_refs, np.arange(len(self.schemes["scheme_id"]) + 1))
+        return self._scheme_order[self._scheme_bounds[ref]:self._scheme_bounds[ref + 1]]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert back to the list-of-dicts format"""
+        return [view.to_dict() for view in self]
+
+
+def measure_memory(chunks_file="scheme_chunks.json"):
+    """Compare memory held by list-of-dicts chunks against a ChunkStore"""
+    with open(chunks_file, 'r', encoding='utf-8') as f:
+        raw = f.read()
+
+    tracemalloc.start()
+    chunks = json.loads(raw)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Parse again under tracing and drop the dicts once the store is built, so
+    # only what the store keeps alive is counted.
+    del chunks
+    tracemalloc.start()
+    chunks = json.loads(raw)
+    store = ChunkStore.from_chunks(chunks)
+    del chunks
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    n = len(store)
+    print(f"Chunks: {n}")
+    print(f"List of dicts: {dict_bytes / 1e6:.2f} MB ({dict_bytes / max(n, 1):.0f} B/chunk)")
+    print(f"ChunkStore:    {store_bytes / 1e6:.2f} MB ({store_bytes / max(n, 1):.0f} B/chunk)")
+    return {"chunks": n, "dict_bytes": dict_bytes, "store_bytes": store_bytes}
+
+
+if __name__ == "__main__":
+    measure_memory(sys.argv[1] if len(sys.argv) > 1 else "scheme_chunks.json")
@@ -0,0 +1,110 @@
+"""Per-slug crawl state for incremental re-scrapes.
+
+Remembers each scheme's ETag / Last-Modified validators and a hash of the
+content last seen, so a re-run can send conditional requests and skip
+parsing when the server answers 304 or the body hashes the same. Every run
+ends with a manifest of the slugs that changed, so downstream processing and
+re-embedding only need to touch those:
+
+    {"generated_at": "...", "changed": ["skerala"], "unchanged": [...],
+     "not_modified": [...], "failed": [...]}
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+
+
+def content_hash(content) -> str:
+    """SHA-256 of raw bytes, text, or any JSON-serializable record"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    elif not isinstance(content, bytes):
+        content = json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class CrawlState:
+    """ETag / Last-Modified / content hash per slug, persisted as JSON"""
+
+    OUTCOMES = ("changed", "unchanged", "not_modified", "failed")
+
+    def __init__(self, filename="crawl_state.json"):
+        self.filename = filename
+        self.entries: Dict[str, Dict] = {}
+        if filename and os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        self.run = {outcome: [] for outcome in self.OUTCOMES}
+
+    def __contains__(self, slug):
+        return slug in self.entries
+
+    def conditional_headers(self, slug) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for a previously seen slug"""
+        entry = self.entries.get(slug, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def not_modified(self, slug):
+        """Record a 304: nothing to download or parse"""
+        self.entries[slug]["checked_at"] = _now()
+        self.run["not_modified"].append(slug)
+
+    def check(self, slug, content, headers=None) -> bool:
+        """Record a fresh response; True if its content differs from the last run"""
+        digest = content_hash(content)
+        entry = self.entries.setdefault(slug, {})
+        changed = entry.get("content_hash") != digest
+        # Keep validators current even when the body is the same, so the next
+        # run can get a 304 instead of a full download
+        if headers is not None:
+            entry["etag"] = headers.get("ETag")
+            entry["last_modified"] = headers.get("Last-Modified")
+        entry["content_hash"] = digest
+        entry["checked_at"] = _now()
+        if changed:
+            entry["changed_at"] = entry["checked_at"]
+        self.run["changed" if changed else "unchanged"].append(slug)
+        return changed
+
+    def failed(self, slug):
+        """Record a failure; forget the slug's validators so the next run refetches it"""
+        for outcome in ("changed", "unchanged", "not_modified"):
+            if slug in self.run[outcome]:
+                self.run[outcome].remove(slug)
+        entry = self.entries.get(slug)
+        if entry is not None:
+            for key in ("etag", "last_modified", "content_hash"):
+                entry.pop(key, None)
+        self.run["failed"].append(slug)
+
+    def changed_slugs(self) -> List[str]:
+        return list(self.run["changed"])
+
+    def save(self):
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+
+    def write_manifest(self, filename="changed_slugs.json"):
+        manifest = {"generated_at": _now(), **self.run}
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        print(f"{len(self.run['changed'])} changed, {len(self.run['unchanged'])} unchanged, "
+              f"{len(self.run['not_modified'])} not modified, {len(self.run['failed'])} failed "
+              f"-> manifest saved to {filename}")
+        return manifest
+
+
+def load_changed_slugs(manifest_file="changed_slugs.json") -> List[str]:
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)["changed"]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
@@ -1,19 +1,63 @@
 import pandas as pd
 import json
+import os
 import re
-import nltk
-from nltk.tokenize import sent_tokenize
-from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer
 import numpy as np
+from keywords import KeywordExtractor
+from dedup import MinHashDeduplicator
+from eligibility import extract_eligibility
+# Bundled sentence splitter and stopwords, so no NLTK downloads are needed
+from text_resources import sent_tokenize, load_stopwords
 
-# Download necessary NLTK resources
-nltk.download('punkt')
-nltk.download('stopwords')
+# Section headings new_scraper.py leaves glued to the front of each field
+SECTION_HEADINGS = {
+    "Ministry/Department": "Details",
+    "Benefits": "Benefits",
+    "Eligibility Criteria": "Eligibility",
+    "Application Process": "Application Process",
+    "Documents Required": "Documents Required",
+}
+
+def _portal_field(record, field):
+    """Read a portal-scraped field, dropping 'N/A' and any leading section heading"""
+    value = record.get(field, '')
+    if not isinstance(value, str) or value.strip() in ('', 'N/A'):
+        return ''
+    heading = SECTION_HEADINGS.get(field)
+    if heading and value.startswith(heading):
+        value = value[len(heading):]
+    return value.strip()
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+def normalize_scheme_record(record):
+    """Map a portal-scraped record (the new_scraper.py format with 'Slug',
+    'Scheme Name', ...) onto the API format the processor works with.
+    Records already in the API format are returned unchanged."""
+    if 'Slug' not in record:
+        return record
+    
+    slug = record.get('Slug', '')
+    # The portal's Details section is the scheme description
+    description = _portal_field(record, 'Description') or _portal_field(record, 'Ministry/Department')
+    return {
+        "id": slug,
+        "name": _portal_field(record, 'Scheme Name') or slug,
+        "description": description,
+        "ministries": [],
+        "target_beneficiaries": _split_list(_portal_field(record, 'Target Beneficiaries')),
+        "eligibility_criteria": _portal_field(record, 'Eligibility Criteria'),
+        "benefits": _portal_field(record, 'Benefits'),
+        "application_process": _portal_field(record, 'Application Process'),
+        "documents_required": _portal_field(record, 'Documents Required'),
+        "tags": _split_list(_portal_field(record, 'Tags'))
+    }
 
 class SchemeDataProcessor:
     def __init__(self, input_file="myscheme_data.json"):
-        self.stop_words = set(stopwords.words('english'))
+        self.input_file = input_file
+        self.stop_words = set(load_stopwords('english'))
         
         # Load the scraped data
         if input_file.endswith('.json'):
@@ -21,6 +65,8 @@ class SchemeDataProcessor:
                 self.schemes = json.load(f)
         else:
             self.schemes = pd.read_csv(input_file).to_dict('records')
+        # Accept both the API scraper and the portal scraper output
+        self.schemes = [normalize_scheme_record(scheme) for scheme in self.schemes]
             
         self.processed_data = []
         self.chunks = []
@@ -63,6 +109,9 @@ class SchemeDataProcessor:
                 "benefits": benefits,
                 "application": application,
                 "tags": tags,
+                # Read from the raw text, since cleaning mangles amounts like "Rs. 2,50,000"
+                "eligibility_attributes": extract_eligibility(scheme.get('eligibility_criteria', ''),
+                                                              scheme.get('name', '')),
                 # Create a consolidated text for embedding
                 "full_text": f"Scheme Name: {name}\n\nDescription: {description}\n\n"
                             f"Ministries/Departments: {ministries}\n\n"
@@ -120,25 +169,53 @@ class SchemeDataProcessor:
                     "tags": scheme['tags']
                 })
     
-    def extract_keywords(self, n_keywords=10):
-        """Extract keywords from each scheme using TF-IDF"""
+    def extract_keywords(self, n_keywords=10, model_file=None, method="tfidf", refit=False):
+        """Extract keywords from each scheme using TF-IDF
+
+        The fitted model is persisted to ``model_file`` (by default next to the
+        input file, ``<input>.keywords.pkl``; False to not persist) and reused on
+        later runs. In TF-IDF mode any scheme the model hasn't seen triggers a
+        refit; with ``method="hashing"`` only those schemes are folded into its
+        document frequencies, so adding schemes never needs a full refit.
+        """
+        if model_file is None:
+            model_file = os.path.splitext(self.input_file)[0] + ".keywords.pkl"
         corpus = [scheme['full_text'] for scheme in self.processed_data]
-        vectorizer = TfidfVectorizer(max_features=500, stop_words=list(self.stop_words))
-        tfidf_matrix = vectorizer.fit_transform(corpus)
-        feature_names = vectorizer.get_feature_names_out()
-        
-        # Extract top keywords for each scheme
-        for i, scheme in enumerate(self.processed_data):
-            # Get the TF-IDF scores for this document
-            tfidf_scores = tfidf_matrix[i].toarray()[0]
-            # Get the indices of the top n scores
-            top_indices = tfidf_scores.argsort()[-n_keywords:][::-1]
-            # Get the corresponding keywords
-            top_keywords = [feature_names[idx] for idx in top_indices]
-            # Add keywords to the scheme
+        extractor = KeywordExtractor.load_or_create(None if refit else model_file,
+                                                    stop_words=self.stop_words, method=method)
+        if extractor.method != method:
+            extractor = KeywordExtractor(stop_words=self.stop_words, method=method)
+        if refit or not extractor.is_fitted:
+            extractor.fit(corpus)
+        else:
+            extractor.partial_fit(corpus)
+
+        # Top keywords are picked straight from each sparse row
+        for scheme, top_keywords in zip(self.processed_data, extractor.top_keywords(corpus, n_keywords)):
             scheme['keywords'] = top_keywords
+
+        if model_file:
+            extractor.save(model_file)
+        self.keyword_extractor = extractor
     
-    def process(self):
+    def deduplicate(self, threshold=0.8):
+        """Collapse near-duplicate chunks and link near-duplicate schemes using MinHash/LSH"""
+        deduplicator = MinHashDeduplicator(threshold=threshold)
+        linked_schemes = deduplicator.link_schemes(self.processed_data)
+        chunks_before = len(self.chunks)
+        self.chunks, merged_chunks = deduplicator.deduplicate_chunks(self.chunks)
+        
+        self.dedup_stats = {
+            "chunks_before": chunks_before,
+            "chunks_after": len(self.chunks),
+            "merged_chunks": merged_chunks,
+            "linked_schemes": linked_schemes
+        }
+        print(f"Merged {merged_chunks} near-duplicate chunks ({chunks_before} -> {len(self.chunks)}), "
+              f"linked {linked_schemes} near-duplicate schemes")
+        return self.dedup_stats
+    
+    def process(self, deduplicate=True):
         """Run the full processing pipeline"""
         print("Extracting and cleaning scheme information...")
         self.extract_key_info()
@@ -149,6 +226,10 @@ class SchemeDataProcessor:
         print("Creating overlapping chunks for CRAG...")
         self.create_chunks()
         
+        if deduplicate:
+            print("Removing near-duplicate chunks...")
+            self.deduplicate()
+        
         print(f"Processing complete. Generated {len(self.processed_data)} processed schemes and {len(self.chunks)} chunks.")
         return self.processed_data, self.chunks
     
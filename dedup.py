@@ -0,0 +1,133 @@
+import re
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Tuple
+
+# Mersenne prime used for the universal hash family
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r'\w+')
+
+
+class MinHashDeduplicator:
+    """Find near-duplicate texts with MinHash signatures and LSH banding.
+
+    Each text is reduced to word shingles, hashed into a ``num_perm``-long
+    MinHash signature, and split into ``bands`` bands. Texts sharing any band
+    become candidate pairs, which are then kept only if their estimated Jaccard
+    similarity reaches ``threshold``.
+    """
+
+    def __init__(self, num_perm=128, bands=16, shingle_size=3, threshold=0.8, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.int64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.int64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + self.shingle_size])
+                     for i in range(len(words) - self.shingle_size + 1)]
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        hashes = {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+        return np.fromiter(hashes, dtype=np.int64, count=len(hashes)) % _PRIME
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """Return an (n_texts, num_perm) array of MinHash signatures"""
+        sigs = np.empty((len(texts), self.num_perm), dtype=np.int64)
+        for i, text in enumerate(texts):
+            shingles = self._shingles(text)
+            sigs[i] = ((self._a[:, None] * shingles[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+        return sigs
+
+    def candidate_pairs(self, sigs: np.ndarray) -> set:
+        """Pairs of rows that collide in at least one LSH band"""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = {}
+            band_sigs = sigs[:, band * self.rows:(band + 1) * self.rows]
+            for i, row in enumerate(band_sigs):
+                buckets.setdefault(row.tobytes(), []).append(i)
+            for members in buckets.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pairs.add((members[x], members[y]))
+        return pairs
+
+    def find_duplicates(self, texts: List[str]) -> List[List[int]]:
+        """Group indices of near-duplicate texts; each group is sorted, first is the representative"""
+        sigs = self.signatures(texts)
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in self.candidate_pairs(sigs):
+            if np.mean(sigs[i] == sigs[j]) >= self.threshold:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+
+        groups = {}
+        for i in range(len(texts)):
+            groups.setdefault(find(i), []).append(i)
+        return [members for members in groups.values() if len(members) > 1]
+
+    def deduplicate_chunks(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Collapse near-duplicate chunks into their first occurrence.
+
+        The kept chunk lists the other schemes its duplicates came from, with
+        their metadata (every field but the text), under ``linked_schemes``.
+        ChunkStore counts a linked chunk as one of each linked scheme's chunks,
+        so state/central variants stay reachable even when all their chunks
+        were merged. Returns the kept chunks and the number merged away.
+        """
+        groups = self.find_duplicates([chunk['text'] for chunk in chunks])
+        dropped = set()
+        linked = {}
+        for members in groups:
+            keep, rest = members[0], members[1:]
+            dropped.update(rest)
+            others = {}
+            for i in rest:
+                scheme_id = chunks[i]['scheme_id']
+                if scheme_id != chunks[keep]['scheme_id'] and scheme_id not in others:
+                    others[scheme_id] = {key: value for key, value in chunks[i].items()
+                                         if key not in ('text', 'linked_schemes')}
+            if others:
+                linked[keep] = [others[scheme_id] for scheme_id in sorted(others, key=str)]
+
+        kept = []
+        for i, chunk in enumerate(chunks):
+            if i in dropped:
+                continue
+            if i in linked:
+                chunk = {**chunk, "linked_schemes": linked[i]}
+            kept.append(chunk)
+        return kept, len(dropped)
+
+    def link_schemes(self, schemes: List[Dict[str, Any]], text_field="full_text") -> int:
+        """Record near-duplicate scheme variants on each scheme as ``near_duplicates``.
+
+        Returns the number of schemes that were linked to at least one other.
+        """
+        groups = self.find_duplicates([scheme.get(text_field, '') for scheme in schemes])
+        linked = 0
+        for members in groups:
+            ids = [schemes[i]['id'] for i in members]
+            for i in members:
+                schemes[i]['near_duplicates'] = [sid for sid in ids if sid != schemes[i]['id']]
+                linked += 1
+        return linked
@@ -0,0 +1,331 @@
+"""Structured eligibility attributes and a columnar matching index.
+
+The processor pulls age ranges, gender, state, income caps and occupations out
+of each scheme's eligibility text (see extract_eligibility). EligibilityIndex
+stores them as numpy columns: numeric bounds as interval columns and the
+categorical fields as precomputed bitmaps, with schemes that don't restrict a
+field set in every bitmap. Matching a profile against the whole catalogue is a
+handful of vectorized comparisons and ANDs:
+
+    index = EligibilityIndex.from_schemes(processed_schemes)
+    index.match(parse_profile("schemes for women over 60 in Maharashtra with income below 2 lakh"))
+
+Extraction is rule-based and errs towards leaving a field unrestricted, since
+a wrong restriction hides a scheme from everyone it applies to.
+"""
+import re
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+
+GENDERS = {"female": 1, "male": 2, "transgender": 4}
+ALL_GENDERS = 7
+
+# Canonical state / UT name -> spellings found in scheme text and queries
+STATES = {
+    "andaman and nicobar islands": ["andaman and nicobar", "andaman & nicobar", "a&n islands"],
+    "andhra pradesh": ["andhra pradesh"],
+    "arunachal pradesh": ["arunachal pradesh"],
+    "assam": ["assam"],
+    "bihar": ["bihar"],
+    "chandigarh": ["chandigarh"],
+    "chhattisgarh": ["chhattisgarh", "chattisgarh"],
+    "dadra and nagar haveli and daman and diu": ["dadra and nagar haveli", "daman and diu", "daman & diu"],
+    "delhi": ["delhi"],
+    "goa": ["goa"],
+    "gujarat": ["gujarat"],
+    "haryana": ["haryana"],
+    "himachal pradesh": ["himachal pradesh"],
+    "jammu and kashmir": ["jammu and kashmir", "jammu & kashmir", "j&k"],
+    "jharkhand": ["jharkhand"],
+    "karnataka": ["karnataka"],
+    "kerala": ["kerala"],
+    "ladakh": ["ladakh"],
+    "lakshadweep": ["lakshadweep"],
+    "madhya pradesh": ["madhya pradesh"],
+    "maharashtra": ["maharashtra"],
+    "manipur": ["manipur"],
+    "meghalaya": ["meghalaya"],
+    "mizoram": ["mizoram"],
+    "nagaland": ["nagaland"],
+    "odisha": ["odisha", "orissa"],
+    "puducherry": ["puducherry", "pondicherry"],
+    "punjab": ["punjab"],
+    "rajasthan": ["rajasthan"],
+    "sikkim": ["sikkim"],
+    "tamil nadu": ["tamil nadu"],
+    "telangana": ["telangana"],
+    "tripura": ["tripura"],
+    "uttar pradesh": ["uttar pradesh"],
+    "uttarakhand": ["uttarakhand", "uttaranchal"],
+    "west bengal": ["west bengal"],
+}
+STATE_BITS = {state: 1 << i for i, state in enumerate(STATES)}
+
+# Occupation -> word prefixes that signal it
+OCCUPATIONS = {
+    "farmer": ["farmer", "farming", "cultivator", "agricultural labour", "kisan"],
+    "student": ["student", "pupil", "scholarship"],
+    "entrepreneur": ["entrepreneur", "startup", "start-up", "self-employed", "self employed", "msme"],
+    "artisan": ["artisan", "craftsm", "weaver", "handloom", "handicraft"],
+    "fisherman": ["fisherm", "fisherfolk", "fisher", "fishing"],
+    "construction_worker": ["construction worker", "building worker", "building and other construction"],
+    "unorganised_worker": ["unorganised worker", "unorganized worker", "labourer", "laborer", "street vendor"],
+    "ex_serviceman": ["ex-servicem", "ex servicem", "veteran"],
+    "researcher": ["researcher", "research scholar", "post doctoral", "post-doctoral", "postdoctoral", "ph.d", "phd"],
+    "unemployed": ["unemployed", "job seeker"],
+}
+OCCUPATION_BITS = {occupation: 1 << i for i, occupation in enumerate(OCCUPATIONS)}
+
+_GENDER_WORDS = {
+    "female": r"\b(?:women|woman|female|females|girls?|widows?|mothers?|daughters?|ladies|lady)\b",
+    "male": r"\b(?:men|man|male|males|boys?)\b",
+    "transgender": r"\b(?:transgenders?|third gender)\b",
+}
+_GENDER_PATTERNS = {gender: re.compile(pattern) for gender, pattern in _GENDER_WORDS.items()}
+_STATE_PATTERNS = {state: re.compile(r"\b(?:" + "|".join(re.escape(name) for name in names) + r")\b")
+                   for state, names in STATES.items()}
+_OCCUPATION_PATTERNS = {occupation: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + ")")
+                        for occupation, words in OCCUPATIONS.items()}
+
+# Clauses that mention a group without restricting to it ("relaxable for women candidates")
+_NON_RESTRICTIVE = re.compile(r"relax|preference|priority|reserv|concession|weightage")
+_CLAUSE_SPLIT = re.compile(r"[.;:\n]\s*|\s\d+\.\s")
+
+_AGE_CONTEXT = re.compile(r"\bage[ds]?\b|\byears? old\b|\bold\b")
+_AGE_RANGE = re.compile(r"(\d{1,3})\s*(?:years?\s*)?(?:-|–|to|and)\s*(\d{1,3})\s*(?:years?)?(?!\s*(?:days|months))")
+_AGE_MIN = re.compile(
+    r"(?:not\s+(?:be\s+)?(?:less|below|under|younger)\s+(?:than\s+)?|above\s+|over\s+|more\s+than\s+|at\s+least\s+|"
+    r"minimum(?:\s+age)?(?:\s+limit)?(?:\s+is|\s+of)?\s+|completed\s+)(\d{1,3})\s*years?"
+    r"|(\d{1,3})\s*years?(?:\s+of\s+age)?\s+(?:and|or)\s+(?:above|more|older)(?!\s+(?:than\s+)?\d)")
+_AGE_MAX = re.compile(
+    r"(?:not\s+(?:be\s+)?(?:more|above|over|older)\s+(?:than\s+)?|not\s+exceed(?:ing)?\s+|below\s+|under\s+|"
+    r"less\s+than\s+|up\s*to\s+|maximum(?:\s+age)?(?:\s+limit)?(?:\s+is|\s+of)?\s+)(\d{1,3})\s*years?"
+    r"|(\d{1,3})\s*years?(?:\s+of\s+age)?\s+(?:and|or)\s+(?:below|less|younger)(?!\s+(?:than\s+)?\d)")
+_NEGATION = re.compile(r"\bnot\b")
+
+_AMOUNT = re.compile(
+    r"(?:rs\.?|inr|₹|rupees)\s*(\d+(?:,\s?\d+)*(?:\.\d+)?)\s*(lakhs?|lacs?|crores?|thousand)?"
+    r"|(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|crores?)\b")
+_MULTIPLIERS = {"lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "crore": 1e7, "crores": 1e7, "thousand": 1e3}
+
+_QUERY_AGE = re.compile(
+    r"\b(?:over|above|under|below|aged?|older\s+than|younger\s+than)\s+(\d{1,3})\b"
+    r"(?!\s*(?:lakhs?|lacs?|crores?|k\b|thousand|rs|rupees|%|,\d|\.\d))"
+    r"|\b(\d{1,3})\s*(?:-\s*)?(?:years?|yrs?)(?:\s*-?\s*old)?\b")
+# A number in a question is only the user's age or income next to words that
+# say so: "loan repayable over 5 years" is not an age, "loan of 5 lakh" not an income
+_QUERY_AGE_WORDS = re.compile(r"\bage[ds]?\b|\bold\b")
+_QUERY_PERSON_BEFORE = re.compile(
+    "(?:" + "|".join(_GENDER_WORDS.values())
+    + r"|\b(?:i am|i'm|he is|she is|persons?|people|citizens?|students?|children|child|sons?|fathers?"
+    r"|farmers?|workers?)\b)\s+(?:(?:a|an|of|is|are|who is|who are)\s+)*$")
+_QUERY_INCOME_WORDS = re.compile(r"\b(?:incomes?|earn\w*|salar(?:y|ies|ied)|wages?)\b")
+
+
+def _clauses(text: str) -> List[str]:
+    return [clause for clause in _CLAUSE_SPLIT.split(text) if clause.strip()]
+
+
+def _parse_amount(match) -> float:
+    number, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    value = float(re.sub(r"[,\s]", "", number))
+    return value * _MULTIPLIERS.get(unit or "", 1.0)
+
+
+def _age_bounds(text: str):
+    """Widest age interval stated in the text, as (min, max) with None for unbounded"""
+    lows, highs = [], []
+    for match in _AGE_RANGE.finditer(text):
+        window = text[max(0, match.start() - 40):match.end() + 15]
+        low, high = int(match.group(1)), int(match.group(2))
+        if _AGE_CONTEXT.search(window) and 0 < low < high <= 120:
+            lows.append(low)
+            highs.append(high)
+    for pattern, bounds, flipped in ((_AGE_MIN, lows, highs), (_AGE_MAX, highs, lows)):
+        for match in pattern.finditer(text):
+            window = text[max(0, match.start() - 40):match.end() + 15]
+            if not _AGE_CONTEXT.search(window):
+                continue
+            value = int(match.group(1) or match.group(2))
+            if not 0 < value <= 120:
+                continue
+            # "should not be aged less than 18 years or above 60 years": the
+            # leading "not" also turns "above 60" into an upper bound
+            preceding = text[max(0, match.start() - 40):match.start()]
+            negated = not match.group(0).startswith("not") and _NEGATION.search(preceding.split(".")[-1])
+            (flipped if negated else bounds).append(value)
+    low = min(lows) if lows else None
+    high = max(highs) if highs else None
+    if low is not None and high is not None and low > high:
+        return None, None
+    return low, high
+
+
+def _income_cap(text: str):
+    """Largest amount stated right after a mention of income, if any"""
+    amounts = []
+    for match in re.finditer(r"\bincome\b", text):
+        window = text[match.end():match.end() + 200]
+        amounts.extend(_parse_amount(amount) for amount in _AMOUNT.finditer(window))
+    amounts = [amount for amount in amounts if amount >= 1000]
+    return max(amounts) if amounts else None
+
+
+def _genders(text: str) -> List[str]:
+    found = set()
+    for clause in _clauses(text):
+        if _NON_RESTRICTIVE.search(clause):
+            continue
+        found.update(gender for gender, pattern in _GENDER_PATTERNS.items() if pattern.search(clause))
+    # A scheme naming both women and men restricts neither
+    if {"female", "male"} <= found:
+        return []
+    return sorted(found)
+
+
+def _states(text: str) -> List[str]:
+    return [state for state, pattern in _STATE_PATTERNS.items() if pattern.search(text)]
+
+
+def _occupations(text: str) -> List[str]:
+    found = set()
+    for clause in _clauses(text):
+        if _NON_RESTRICTIVE.search(clause):
+            continue
+        found.update(occupation for occupation, pattern in _OCCUPATION_PATTERNS.items() if pattern.search(clause))
+    return sorted(found)
+
+
+def extract_eligibility(eligibility_text: str, name: str = "") -> Dict[str, Any]:
+    """Structured attributes of one scheme's eligibility text; empty / None means unrestricted"""
+    text = eligibility_text.lower() if isinstance(eligibility_text, str) else ""
+    min_age, max_age = _age_bounds(text)
+    return {
+        "min_age": min_age,
+        "max_age": max_age,
+        "genders": _genders(text),
+        # State-specific schemes often only name the state in their title
+        "states": _states(text + " " + (name.lower() if isinstance(name, str) else "")),
+        "max_income": _income_cap(text),
+        "occupations": _occupations(text),
+    }
+
+
+def parse_profile(query: str) -> Dict[str, Any]:
+    """User profile stated in a question; numbers next to age / income words are the user's age / income"""
+    text = query.lower()
+    profile = {}
+    ages = [int(match.group(1) or match.group(2)) for match in _QUERY_AGE.finditer(text)
+            if _QUERY_AGE_WORDS.search(text[max(0, match.start() - 15):match.end() + 10])
+            or _QUERY_PERSON_BEFORE.search(text[max(0, match.start() - 25):match.start()])]
+    if ages:
+        profile["age"] = ages[0]
+    elif re.search(r"\bsenior citizens?\b|\belderly\b", text):
+        profile["age"] = 60
+    genders = [gender for gender, pattern in _GENDER_PATTERNS.items() if pattern.search(text)]
+    if len(genders) == 1:
+        profile["gender"] = genders[0]
+    states = _states(text)
+    if len(states) == 1:
+        profile["state"] = states[0]
+    amounts = [_parse_amount(amount) for amount in _AMOUNT.finditer(text)
+               if _QUERY_INCOME_WORDS.search(re.split(r"[.;?!]", text[max(0, amount.start() - 30):amount.start()])[-1])
+               or _QUERY_INCOME_WORDS.search(text[amount.end():amount.end() + 20])]
+    if amounts:
+        profile["income"] = amounts[0]
+    occupations = _occupations(text)
+    if len(occupations) == 1:
+        profile["occupation"] = occupations[0]
+    return profile
+
+
+class EligibilityIndex:
+    """Columnar eligibility attributes for the whole catalogue"""
+
+    def __init__(self, scheme_ids: List, attributes: List[Dict[str, Any]]):
+        self.scheme_ids = np.array(scheme_ids, dtype=object)
+
+        def column(key, default, dtype):
+            return np.array([default if a.get(key) is None else a[key] for a in attributes], dtype=dtype)
+
+        # Interval columns: a scheme applies when the profile value lies in its bounds
+        self.min_age = column("min_age", 0, np.float32)
+        self.max_age = column("max_age", np.inf, np.float32)
+        self.max_income = column("max_income", np.inf, np.float64)
+
+        # Categorical fields as bit masks (0 = unrestricted) ...
+        self.gender = np.array([sum(GENDERS[g] for g in a.get("genders") or []) or ALL_GENDERS
+                                for a in attributes], dtype=np.uint8)
+        self.states = np.array([sum(STATE_BITS[s] for s in a.get("states") or []) for a in attributes],
+                               dtype=np.uint64)
+        self.occupations = np.array([sum(OCCUPATION_BITS[o] for o in a.get("occupations") or [])
+                                     for a in attributes], dtype=np.uint32)
+
+        # ... expanded into one precomputed bitmap per value
+        self.gender_bitmaps = {gender: (self.gender & bit) != 0 for gender, bit in GENDERS.items()}
+        self.state_bitmaps = {state: (self.states == 0) | ((self.states & np.uint64(bit)) != 0)
+                              for state, bit in STATE_BITS.items()}
+        self.occupation_bitmaps = {occupation: (self.occupations == 0) | ((self.occupations & bit) != 0)
+                                   for occupation, bit in OCCUPATION_BITS.items()}
+
+    @classmethod
+    def from_schemes(cls, schemes: List[Dict[str, Any]]) -> "EligibilityIndex":
+        """Build from processed schemes, extracting attributes for any that lack them"""
+        attributes = [scheme.get("eligibility_attributes")
+                      or extract_eligibility(scheme.get("eligibility", ""), scheme.get("name", ""))
+                      for scheme in schemes]
+        return cls([scheme["id"] for scheme in schemes], attributes)
+
+    def __len__(self):
+        return len(self.scheme_ids)
+
+    def match_mask(self, profile: Dict[str, Any]) -> np.ndarray:
+        """Boolean column of schemes the profile is eligible for; unknown fields don't filter"""
+        mask = np.ones(len(self), dtype=bool)
+        if profile.get("age") is not None:
+            mask &= (self.min_age <= profile["age"]) & (self.max_age >= profile["age"])
+        if profile.get("income") is not None:
+            mask &= self.max_income >= profile["income"]
+        if profile.get("gender") in self.gender_bitmaps:
+            mask &= self.gender_bitmaps[profile["gender"]]
+        if profile.get("state") in self.state_bitmaps:
+            mask &= self.state_bitmaps[profile["state"]]
+        if profile.get("occupation") in self.occupation_bitmaps:
+            mask &= self.occupation_bitmaps[profile["occupation"]]
+        return mask
+
+    def match(self, profile: Dict[str, Any]) -> List:
+        return self.scheme_ids[self.match_mask(profile)].tolist()
+
+
+def benchmark_matching(n_schemes=100_000, n_profiles=1000, seed=0):
+    """Time profile matching over a synthetic catalogue of random attributes"""
+    rng = np.random.default_rng(seed)
+    states = list(STATES)
+    occupations = list(OCCUPATIONS)
+    attributes = [{
+        "min_age": int(rng.integers(0, 40)) if rng.random() < 0.4 else None,
+        "max_age": int(rng.integers(40, 80)) if rng.random() < 0.4 else None,
+        "genders": ["female"] if rng.random() < 0.2 else [],
+        "states": [states[rng.integers(len(states))]] if rng.random() < 0.6 else [],
+        "max_income": float(rng.integers(1, 10)) * 1e5 if rng.random() < 0.3 else None,
+        "occupations": [occupations[rng.integers(len(occupations))]] if rng.random() < 0.5 else [],
+    } for _ in range(n_schemes)]
+    start = time.perf_counter()
+    index = EligibilityIndex(list(range(n_schemes)), attributes)
+    build = time.perf_counter() - start
+
+    profiles = [{"age": int(rng.integers(18, 80)), "gender": "female",
+                 "state": states[rng.integers(len(states))], "income": float(rng.integers(1, 10)) * 1e5,
+                 "occupation": occupations[rng.integers(len(occupations))]} for _ in range(n_profiles)]
+    start = time.perf_counter()
+    matches = sum(int(index.match_mask(profile).sum()) for profile in profiles)
+    elapsed = time.perf_counter() - start
+    print(f"Built index over {n_schemes} schemes in {build:.2f}s; "
+          f"{elapsed / n_profiles * 1000:.3f} ms per profile, {matches / n_profiles:.0f} matches on average")
+
+
+if __name__ == "__main__":
+    benchmark_matching()
@@ -0,0 +1,146 @@
+"""Retrieval quality and speed evaluation against a labelled query set.
+
+The query file is JSON (a list) or JSON Lines, one entry per query:
+
+    {"query": "pension for bedridden patients in Kerala", "scheme_ids": ["skerala"]}
+
+Both retrieve_relevant_chunks (ranked chunks, deduplicated by scheme) and
+get_scheme_suggestions are scored with recall@k, MRR and nDCG@k alongside
+queries/sec, so a speed change can be judged on both axes:
+
+    python evaluate.py labelled_queries.jsonl --k 5 --output eval_results.json
+"""
+import argparse
+import json
+import math
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+
+
+def load_labelled_queries(filename) -> List[Dict[str, Any]]:
+    with open(filename, 'r', encoding='utf-8') as f:
+        if filename.endswith('.jsonl'):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+    # Accept a single expected id as well as a list
+    for entry in entries:
+        if "scheme_id" in entry and "scheme_ids" not in entry:
+            entry["scheme_ids"] = [entry["scheme_id"]]
+    return entries
+
+
+def _unique(ids):
+    seen = set()
+    return [i for i in ids if not (i in seen or seen.add(i))]
+
+
+def recall_at_k(ranked, relevant, k):
+    if not relevant:
+        return 0.0
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant)
+
+
+def reciprocal_rank(ranked, relevant):
+    for rank, item in enumerate(ranked, start=1):
+        if item in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked, relevant, k):
+    relevant = set(relevant)
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, item in enumerate(ranked[:k], start=1) if item in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def score_rankings(rankings: List[List[Any]], labels: List[List[Any]], k: int) -> Dict[str, float]:
+    """Mean recall@k, MRR and nDCG@k over a batch of rankings"""
+    return {
+        f"recall@{k}": float(np.mean([recall_at_k(r, l, k) for r, l in zip(rankings, labels)])),
+        "mrr": float(np.mean([reciprocal_rank(r, l) for r, l in zip(rankings, labels)])),
+        f"ndcg@{k}": float(np.mean([ndcg_at_k(r, l, k) for r, l in zip(rankings, labels)]))
+    }
+
+
+def _timed(fn, queries):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(fn(query))
+    elapsed = time.perf_counter() - start
+    return results, {"seconds": elapsed, "queries_per_s": len(queries) / elapsed if elapsed else float("inf")}
+
+
+def evaluate(qa_system, labelled_queries, k=5) -> Dict[str, Any]:
+    """Run every labelled query through chunk retrieval and scheme suggestion"""
+    queries = [entry["query"] for entry in labelled_queries]
+    labels = [entry["scheme_ids"] for entry in labelled_queries]
+
+    # Warm up so the first encode doesn't count against throughput
+    if queries:
+        qa_system.retrieve_relevant_chunks(queries[0], top_k=k)
+
+    # Start each timed pass with an empty query embedding cache, so the second
+    # pass is not timed on embeddings the first one left behind
+    qa_system.query_cache.clear()
+    chunk_results, chunk_speed = _timed(lambda q: qa_system.retrieve_relevant_chunks(q, top_k=k), queries)
+    chunk_rankings = [_unique(chunk['scheme_id'] for chunk in chunks) for chunks in chunk_results]
+
+    qa_system.query_cache.clear()
+    suggestion_results, suggestion_speed = _timed(lambda q: qa_system.get_scheme_suggestions(q, top_k=k), queries)
+    suggestion_rankings = [[s['id'] for s in suggestions] for suggestions in suggestion_results]
+
+    per_query = [
+        {
+            "query": query,
+            "expected": expected,
+            "chunk_ranking": chunk_ranking,
+            "suggestion_ranking": suggestion_ranking
+        }
+        for query, expected, chunk_ranking, suggestion_ranking
+        in zip(queries, labels, chunk_rankings, suggestion_rankings)
+    ]
+
+    return {
+        "k": k,
+        "queries": len(queries),
+        "retrieve_relevant_chunks": {**score_rankings(chunk_rankings, labels, k), **chunk_speed},
+        "get_scheme_suggestions": {**score_rankings(suggestion_rankings, labels, k), **suggestion_speed},
+        "per_query": per_query
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and speed")
+    parser.add_argument("queries", help="Labelled queries (.json list or .jsonl)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--chunks", default="scheme_chunks.json")
+    parser.add_argument("--processed", default="processed_schemes.json")
+    parser.add_argument("--no-diversify", action="store_true", help="Plain relevance order, no MMR")
+    parser.add_argument("--rerank", action="store_true", help="Rescore candidates with the cross-encoder")
+    parser.add_argument("--two-stage", action="store_true", help="Coarse scheme search, then only their chunks")
+    parser.add_argument("--gpu", action="store_true")
+    parser.add_argument("--output", default=None, help="Write full results (incl. per-query rankings) as JSON")
+    args = parser.parse_args()
+
+    from scheme_qa import SchemeQASystem
+    qa_system = SchemeQASystem(chunks_file=args.chunks, processed_data_file=args.processed,
+                               use_gpu=args.gpu, diversify=not args.no_diversify,
+                               rerank=args.rerank, two_stage=args.two_stage)
+    results = evaluate(qa_system, load_labelled_queries(args.queries), args.k)
+
+    for name in ("retrieve_relevant_chunks", "get_scheme_suggestions"):
+        metrics = results[name]
+        print(f"{name}: " + ", ".join(f"{key}={value:.3f}" for key, value in metrics.items()))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Evaluation results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from typing import List
+
+
+def top_k_per_row(matrix, k: int) -> List[np.ndarray]:
+    """Return the column indices of the k largest entries of each row, best first.
+
+    Works directly on the CSR arrays, so each row costs O(nnz) via argpartition
+    instead of densifying it and sorting the whole vocabulary.
+    """
+    matrix = sp.csr_matrix(matrix)
+    results = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        data = matrix.data[start:end]
+        cols = matrix.indices[start:end]
+        if k <= 0 or len(data) == 0:
+            results.append(cols[:0])
+            continue
+        if len(data) > k:
+            candidates = np.argpartition(-data, k - 1)[:k]
+        else:
+            candidates = np.arange(len(data))
+        order = candidates[np.argsort(-data[candidates], kind="stable")]
+        results.append(cols[order])
+    return results
+
+
+def _doc_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class KeywordExtractor:
+    """TF-IDF keyword extraction with a persistent fitted model.
+
+    ``method="tfidf"`` fits a regular TfidfVectorizer and reuses its vocabulary
+    and IDF on later runs until the corpus gains a document, which triggers a
+    refit. ``method="hashing"`` uses a stateless
+    HashingVectorizer and keeps document frequencies itself, so new schemes can
+    be folded in with ``partial_fit`` without refitting the whole corpus.
+    """
+
+    def __init__(self, stop_words=None, method="tfidf", max_features=None, n_features=2 ** 18):
+        if method not in ("tfidf", "hashing"):
+            raise ValueError(f"Unknown keyword method: {method}")
+        self.method = method
+        self.stop_words = list(stop_words) if stop_words else None
+        self.seen_docs = set()
+
+        if method == "tfidf":
+            self.vectorizer = TfidfVectorizer(max_features=max_features, stop_words=self.stop_words)
+            self.feature_names = None
+        else:
+            self.vectorizer = HashingVectorizer(n_features=n_features, stop_words=self.stop_words,
+                                                alternate_sign=False, norm=None)
+            self.doc_freq = np.zeros(n_features, dtype=np.int64)
+            self.n_docs = 0
+            # Hashing isn't invertible, so remember which term landed in each bucket
+            self.bucket_terms = {}
+            self.known_terms = set()
+
+    @property
+    def is_fitted(self):
+        return bool(self.seen_docs)
+
+    def fit(self, corpus: List[str]):
+        """Fit from scratch on the full corpus"""
+        if self.method == "tfidf":
+            self.vectorizer.fit(corpus)
+            self.feature_names = self.vectorizer.get_feature_names_out()
+            self.seen_docs = {_doc_hash(doc) for doc in corpus}
+        else:
+            self.doc_freq[:] = 0
+            self.n_docs = 0
+            self.bucket_terms = {}
+            self.known_terms = set()
+            self.seen_docs = set()
+            self.partial_fit(corpus)
+        return self
+
+    def partial_fit(self, corpus: List[str]):
+        """Fold documents that haven't been seen before into the model"""
+        if self.method == "tfidf":
+            # A fitted TF-IDF vocabulary can't be extended, so any unseen
+            # document means a full refit; otherwise its terms would be lost
+            if self.is_fitted and all(_doc_hash(doc) in self.seen_docs for doc in corpus):
+                return self
+            return self.fit(corpus)
+
+        new_docs = []
+        for doc in corpus:
+            key = _doc_hash(doc)
+            if key not in self.seen_docs:
+                self.seen_docs.add(key)
+                new_docs.append(doc)
+        if not new_docs:
+            return self
+
+        counts = self.vectorizer.transform(new_docs)
+        counts.data[:] = 1
+        self.doc_freq += np.asarray(counts.sum(axis=0)).ravel().astype(np.int64)
+        self.n_docs += len(new_docs)
+        self._record_terms(new_docs)
+        return self
+
+    def _record_terms(self, docs: List[str]):
+        analyzer = self.vectorizer.build_analyzer()
+        terms = list({term for doc in docs for term in analyzer(doc)} - self.known_terms)
+        if not terms:
+            return
+        self.known_terms.update(terms)
+        # Each term re-tokenizes to itself, so hashing the terms as one-word
+        # documents gives every term's bucket in a single call.
+        buckets = self.vectorizer.transform(terms).tocsr()
+        for i, term in enumerate(terms):
+            start, end = buckets.indptr[i], buckets.indptr[i + 1]
+            if end - start == 1:
+                self.bucket_terms.setdefault(int(buckets.indices[start]), term)
+
+    def transform(self, corpus: List[str]):
+        """Return the TF-IDF matrix (CSR) for the corpus using the fitted model"""
+        if not self.is_fitted:
+            raise ValueError("KeywordExtractor has not been fitted yet")
+        if self.method == "tfidf":
+            return self.vectorizer.transform(corpus)
+
+        # Same smoothed IDF as TfidfVectorizer
+        idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        counts = self.vectorizer.transform(corpus).tocsr()
+        counts.data = counts.data * idf[counts.indices]
+        return counts
+
+    def top_keywords(self, corpus: List[str], n_keywords=10) -> List[List[str]]:
+        """Return the top n keywords for each document in the corpus"""
+        matrix = self.transform(corpus)
+        keywords = []
+        for cols in top_k_per_row(matrix, n_keywords):
+            if self.method == "tfidf":
+                keywords.append([str(self.feature_names[col]) for col in cols])
+            else:
+                keywords.append([self.bucket_terms[int(col)] for col in cols if int(col) in self.bucket_terms])
+        return keywords
+
+    def save(self, filename="keyword_model.pkl"):
+        """Persist the fitted vocabulary/IDF (or hashing document frequencies)"""
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f)
+        print(f"Keyword model saved to {filename}")
+
+    @classmethod
+    def load(cls, filename="keyword_model.pkl") -> "KeywordExtractor":
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+    @classmethod
+    def load_or_create(cls, filename=None, **kwargs) -> "KeywordExtractor":
+        if filename and os.path.exists(filename):
+            return cls.load(filename)
+        return cls(**kwargs)
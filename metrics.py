@@ -0,0 +1,153 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+
+# Latency buckets in seconds, from sub-millisecond FAISS searches to long generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Decode throughput buckets in tokens/sec
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+# Generated token count buckets
+TOKEN_BUCKETS = (8, 16, 32, 64, 96, 128, 160, 192, 256, 384, 512)
+
+
+def _format_value(value) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+class Histogram:
+    """Thread-safe histogram, optionally split by a single label"""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS, label_name: str = None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.label_name = label_name
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label: str = None):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def summary(self) -> Dict[Any, Dict[str, float]]:
+        """Count, sum and mean per label"""
+        with self._lock:
+            return {
+                label: {"count": s["count"], "sum": s["sum"], "mean": s["sum"] / s["count"] if s["count"] else 0.0}
+                for label, s in self._series.items()
+            }
+
+    def render(self):
+        """Prometheus text exposition lines for this histogram"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label, series in sorted(self._series.items(), key=lambda item: str(item[0])):
+                labels = {self.label_name: label} if self.label_name and label is not None else {}
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    bucket_labels = {**labels, "le": _format_value(bound)}
+                    lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter",
+                f"{self.name} {self.value}"]
+
+
+class MetricsRegistry:
+    """Collection of histograms and counters rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS, label_name: str = None) -> Histogram:
+        """Get or create a histogram by name"""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, buckets, label_name)
+            return self._metrics[name]
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Get or create a counter by name"""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help_text)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """Per-request record of stage timings, mirrored into a stage histogram"""
+
+    def __init__(self, stage_histogram: Histogram = None):
+        self.stage_histogram = stage_histogram
+        self.stages = {}
+        self.values = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Add time spent in a stage (repeated stages accumulate)"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.stage_histogram is not None:
+            self.stage_histogram.observe(seconds, name)
+
+    def set(self, name: str, value):
+        """Attach a non-timing value such as a token count"""
+        self.values[name] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            **self.values
+        }
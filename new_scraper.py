@@ -1,60 +1,58 @@
+import argparse
 import json
 import os
 import time
+import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+
+from crawl_state import CrawlState
+from scheme_page import extract_scheme_page
 
 # === CONFIGURATION ===
 OUTPUT_FILE = 'all_schemes_final.json'
 BASE_URL = "https://www.myscheme.gov.in/schemes/{}"
 
+STATE_FILE = 'crawl_state.json'
+MANIFEST_FILE = 'changed_slugs.json'
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
 # === Selenium Setup ===
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")  # run without opening browser
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-wait = WebDriverWait(driver, 15)
+# Started on first use, so an incremental run where nothing changed never launches Chrome
+driver = None
+wait = None
+
+def get_driver():
+    global driver, wait
+    if driver is None:
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless")  # run without opening browser
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        wait = WebDriverWait(driver, 15)
+    return driver
 
 # === Function to scrape scheme details ===
 def scrape_scheme_details(slug):
     url = BASE_URL.format(slug)
     print(f"🔎 Scraping: {url}")
     try:
-        driver.get(url)
+        get_driver().get(url)
         wait.until(EC.presence_of_element_located((By.ID, "eligibility")))
         time.sleep(1)  # slight wait
     except Exception as e:
         print(f"⚠️ Error loading {slug}: {e}")
         return {}
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-
-    def get_div_text(div_id):
-        div = soup.find('div', id=div_id)
-        return div.text.strip() if div and div.text.strip() else "N/A"
-
-    scraped_data = {
-        "Slug": slug,
-        "Scheme Name": soup.find("h1").text.strip() if soup.find("h1") else "N/A",
-        "Ministry/Department": get_div_text("details"),
-        "Target Beneficiaries": get_div_text("target-beneficiaries"),
-        "Description": get_div_text("description"),
-        "Benefits": get_div_text("benefits"),
-        "Eligibility Criteria": get_div_text("eligibility"),
-        "Application Process": get_div_text("application-process"),
-        "Documents Required": get_div_text("documents-required"),
-    }
-
-    tags_section = soup.find_all("a", class_="tag-item")
-    scraped_data["Tags"] = ', '.join([tag.text.strip() for tag in tags_section]) if tags_section else "N/A"
-
-    return scraped_data
+    # Title, sections and tags in one lxml pass, with section headings stripped
+    return extract_scheme_page(driver.page_source, slug)
 
 # === Function to save to JSON (append) ===
 def save_scheme_data(new_data):
@@ -71,6 +69,56 @@ def save_scheme_data(new_data):
 
     print(f"✅ Saved slug '{new_data['Slug']}' to '{OUTPUT_FILE}'")
 
+# === Incremental re-scrape ===
+def page_changed(slug, state):
+    """Conditional GET of the scheme page; False on a 304 or an unchanged body hash"""
+    try:
+        response = requests.get(BASE_URL.format(slug), headers={**HEADERS, **state.conditional_headers(slug)},
+                                timeout=30)
+    except requests.RequestException as e:
+        print(f"⚠️ Conditional check failed for {slug}: {e}")
+        return True
+    if response.status_code == 304:
+        state.not_modified(slug)
+        return False
+    if response.status_code != 200:
+        # Let Selenium have a go; the browser may get through where requests didn't
+        return True
+    return state.check(slug, response.content, response.headers)
+
+def rescrape(slugs=None, state_file=STATE_FILE, manifest_file=MANIFEST_FILE):
+    """Re-scrape only the schemes whose pages changed since the last run
+
+    Defaults to every slug already in OUTPUT_FILE. Changed schemes replace
+    their old records in place and their slugs are written to manifest_file.
+    """
+    existing = {}
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            existing = {scheme['Slug']: scheme for scheme in json.load(f)}
+    slugs = slugs or list(existing)
+    state = CrawlState(state_file)
+
+    for slug in slugs:
+        if not page_changed(slug, state):
+            print(f"⏭️ Unchanged: {slug}")
+            continue
+        scheme_data = scrape_scheme_details(slug)
+        if not scheme_data:
+            state.failed(slug)
+            continue
+        if slug not in state.run["changed"]:
+            # The page had to come from the browser, so hash the parsed record instead
+            state.check(slug, scheme_data)
+        existing[slug] = scheme_data
+
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(list(existing.values()), f, indent=2, ensure_ascii=False)
+    state.save()
+    if driver is not None:
+        driver.quit()
+    return state.write_manifest(manifest_file)
+
 # === Main Interactive Loop ===
 def main():
     print("\n🛠️ Enter slugs one by one. Type 'exit' to stop.\n")
@@ -86,8 +134,17 @@ def main():
         if scheme_data:
             save_scheme_data(scheme_data)
 
-    driver.quit()
+    if driver is not None:
+        driver.quit()
     print("\n👋 Done. Exiting...")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scrape MyScheme scheme pages by slug")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Re-scrape only changed schemes and write {MANIFEST_FILE}")
+    parser.add_argument("--slugs", nargs="*", help="Slugs to check (default: all in the output file)")
+    args = parser.parse_args()
+    if args.incremental:
+        rescrape(args.slugs)
+    else:
+        main()
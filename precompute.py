@@ -0,0 +1,171 @@
+"""Offline bulk answer precomputation for recurring questions.
+
+Queries are split into batches and spread over a process pool. The FAISS
+indexes are built once in the parent (into --index-dir, or a temporary
+directory) and memory-mapped by every worker. Each worker holds one
+SchemeQASystem, embeds and searches a whole batch in one call and answers
+with greedy decoding, so the same question always gets the same answer. Results
+go into a SQLite store keyed by the normalized query, which
+SchemeQASystem(answer_store=...) checks before generating live. Queries
+already in the store are skipped, so an interrupted run resumes where it
+stopped:
+
+    python precompute.py top_queries.txt --store precomputed_answers.sqlite --workers 4
+
+The query file is plain text (one query per line), JSON Lines or a JSON
+list with a "query" field per entry.
+"""
+import argparse
+import json
+import multiprocessing
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+from query_cache import normalize_query
+
+
+class AnswerStore:
+    """Persistent normalized query -> precomputed answer record, backed by SQLite"""
+
+    def __init__(self, filename="precomputed_answers.sqlite"):
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(query: str) -> str:
+        return normalize_query(query)
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM answers WHERE key = ?", (self.key(query),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO answers (key, value) VALUES (?, ?)",
+                                   [(self.key(r["query"]), json.dumps(r, ensure_ascii=False)) for r in records])
+            self._conn.commit()
+
+    def keys(self) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT key FROM answers")}
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+def load_queries(filename) -> List[str]:
+    with open(filename, 'r', encoding='utf-8') as f:
+        if filename.endswith('.jsonl'):
+            return [json.loads(line)["query"] for line in f if line.strip()]
+        if filename.endswith('.json'):
+            return [entry["query"] if isinstance(entry, dict) else entry for entry in json.load(f)]
+        return [line.strip() for line in f if line.strip()]
+
+
+# One QA system per worker process, created by the pool initializer
+_qa_system = None
+
+
+def _init_worker(config, threads):
+    global _qa_system
+    import torch
+    torch.set_num_threads(threads)
+    from scheme_qa import SchemeQASystem
+    _qa_system = SchemeQASystem(**config)
+
+
+def _answer_batch(queries: List[str]) -> List[Dict[str, Any]]:
+    # Embed and search the whole batch at once; the retrievals below reuse its hits
+    _qa_system.search_queries(queries)
+    records = []
+    for query in queries:
+        result = _qa_system.answer_query(query, do_sample=False)
+        records.append({
+            "query": query,
+            "answer": result["answer"],
+            "relevant_schemes": result["relevant_schemes"],
+            "sources": _qa_system.chunk_sources(result["chunks_used"]),
+            "generation_ms": result["trace"]["stages_ms"].get("decode", 0.0)
+                             + result["trace"]["stages_ms"].get("prefill", 0.0),
+            "generated_at": datetime.now(timezone.utc).isoformat()
+        })
+    return records
+
+
+def precompute(queries: List[str], store: AnswerStore, config: Dict[str, Any] = None,
+               workers=2, batch_size=16, threads_per_worker=1):
+    """Answer every query not yet in the store, writing each batch as it finishes"""
+    done = store.keys()
+    pending = list({AnswerStore.key(q): q for q in queries if AnswerStore.key(q) not in done}.values())
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} already precomputed, {len(pending)} to go")
+    if not pending:
+        return 0
+
+    config = dict(config or {})
+    temporary_index_dir = None
+    if not config.get("index_dir"):
+        temporary_index_dir = config["index_dir"] = tempfile.mkdtemp(prefix="precompute_index_")
+    _build_indexes(config)
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    completed = 0
+    start = time.perf_counter()
+    try:
+        # spawn, so workers never inherit a half-initialized torch from the parent
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(config, threads_per_worker)) as pool:
+            futures = [pool.submit(_answer_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                records = future.result()
+                store.put_many(records)
+                completed += len(records)
+                elapsed = time.perf_counter() - start
+                print(f"{completed}/{len(pending)} answered ({completed / elapsed:.2f} queries/s)")
+    finally:
+        if temporary_index_dir:
+            shutil.rmtree(temporary_index_dir, ignore_errors=True)
+    return completed
+
+
+def _build_indexes(config):
+    """Build (or validate) the saved indexes once, so workers only read them"""
+    from scheme_qa import SchemeQASystem
+    SchemeQASystem(**{**config, "load_generator": False})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute answers for recurring questions")
+    parser.add_argument("queries", help="Query file (.txt, .jsonl or .json)")
+    parser.add_argument("--store", default="precomputed_answers.sqlite")
+    parser.add_argument("--chunks", default="scheme_chunks.json")
+    parser.add_argument("--processed", default="processed_schemes.json")
+    parser.add_argument("--index-dir", default=None, help="Reuse FAISS indexes saved here")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--gpu", action="store_true")
+    args = parser.parse_args()
+
+    config = {"chunks_file": args.chunks, "processed_data_file": args.processed,
+              "index_dir": args.index_dir, "use_gpu": args.gpu}
+    store = AnswerStore(args.store)
+    precompute(load_queries(args.queries), store, config, args.workers, args.batch_size,
+               args.threads_per_worker)
+    print(f"Answer store now holds {len(store)} answers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: NFKC, lowercase, punctuation dropped, whitespace collapsed.
+
+    "PM Kisan?" and "  pm   kisan " both become "pm kisan". Only punctuation
+    is removed, so Devanagari vowel signs (which are not \\w) survive.
+    """
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class QueryEmbeddingCache:
+    """Bounded, thread-safe LRU of normalized query -> embedding vector"""
+
+    def __init__(self, maxsize=1024, hit_counter=None, miss_counter=None):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Optional metrics.Counter objects mirrored on every lookup
+        self._hit_counter = hit_counter
+        self._miss_counter = miss_counter
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                counter = self._miss_counter
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                counter = self._hit_counter
+        if counter is not None:
+            counter.inc()
+        # Callers get their own copy so in-place ops can't corrupt the cache
+        return None if vector is None else vector.copy()
+
+    def put(self, key: str, vector: np.ndarray):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = vector.copy()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
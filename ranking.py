@@ -0,0 +1,53 @@
+import numpy as np
+from typing import List
+
+
+def maximal_marginal_relevance(relevance: np.ndarray, embeddings: np.ndarray, k: int,
+                               lambda_mult: float = 0.5) -> List[int]:
+    """Pick k candidates trading off relevance against redundancy (MMR).
+
+    ``relevance`` holds each candidate's similarity to the query and
+    ``embeddings`` the candidates' L2-normalized vectors. Returns candidate
+    positions in selection order. ``lambda_mult=1`` is plain relevance order.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = embeddings @ embeddings.T
+    # Highest similarity of each candidate to anything already selected
+    max_sim = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected = []
+
+    for _ in range(k):
+        mmr = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        max_sim = np.maximum(max_sim, similarity[best])
+
+    return selected
+
+
+class CrossEncoderReranker:
+    """Rescore a bounded set of retrieved candidates with a small cross-encoder.
+
+    All (query, text) pairs go through the model in one batched forward pass,
+    so the cost is bounded by the candidate budget rather than the corpus.
+    """
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", device="cpu", max_length=256):
+        # Imported here so the numpy-only ranking helpers don't pull in torch
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, device=device, max_length=max_length)
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        pairs = [(query, text) for text in texts]
+        return np.asarray(self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False),
+                          dtype=np.float32)
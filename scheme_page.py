@@ -0,0 +1,113 @@
+"""Single-pass extraction of a MyScheme scheme page.
+
+One lxml parse and one XPath query collect the title, every section div
+and the tags in document order, instead of a full BeautifulSoup tree and
+a separate find() per section. Section headings ("Details", "Benefits", ...)
+are dropped rather than glued to the front of the text.
+
+    python scheme_page.py page_source.html --repeats 50
+"""
+import argparse
+import time
+
+import lxml.html
+
+# Output field -> id of the section div on the scheme page
+SECTION_IDS = {
+    "Ministry/Department": "details",
+    "Target Beneficiaries": "target-beneficiaries",
+    "Description": "description",
+    "Benefits": "benefits",
+    "Eligibility Criteria": "eligibility",
+    "Application Process": "application-process",
+    "Documents Required": "documents-required",
+}
+_FIELD_BY_ID = {div_id: field for field, div_id in SECTION_IDS.items()}
+
+_HEADING_TAGS = {"a", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+# Everything we need, matched in one pass over the tree
+_QUERY = ("//h1 | //a[contains(concat(' ', normalize-space(@class), ' '), ' tag-item ')] | //div["
+          + " or ".join(f"@id='{div_id}'" for div_id in SECTION_IDS.values()) + "]")
+
+
+def _section_text(div) -> str:
+    """Section text without its leading heading link"""
+    text = div.text_content()
+    first = div[0] if len(div) else None
+    if first is not None and first.tag in _HEADING_TAGS:
+        heading = first.text_content()
+        if heading and text.startswith(heading):
+            text = text[len(heading):]
+    return text.strip()
+
+
+def extract_scheme_page(html, slug="") -> dict:
+    """Parse a scheme page into the new_scraper.py record format"""
+    root = lxml.html.fromstring(html)
+    record = {"Slug": slug, "Scheme Name": "N/A", **{field: "N/A" for field in SECTION_IDS}}
+    tags = []
+    for element in root.xpath(_QUERY):
+        if element.tag == "h1":
+            # The first h1 on the page is an icon button with no text
+            title = element.text_content().strip()
+            if title and record["Scheme Name"] == "N/A":
+                record["Scheme Name"] = title
+        elif element.tag == "a":
+            tags.append(element.text_content().strip())
+        else:
+            field = _FIELD_BY_ID[element.get("id")]
+            if record[field] == "N/A":
+                record[field] = _section_text(element) or "N/A"
+    record["Tags"] = ', '.join(tags) if tags else "N/A"
+    return record
+
+
+def _extract_with_beautifulsoup(html, slug=""):
+    """The previous per-section BeautifulSoup scan, kept for benchmarking"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    def get_div_text(div_id):
+        div = soup.find('div', id=div_id)
+        return div.text.strip() if div and div.text.strip() else "N/A"
+
+    record = {"Slug": slug, "Scheme Name": soup.find("h1").text.strip() if soup.find("h1") else "N/A"}
+    record.update({field: get_div_text(div_id) for field, div_id in SECTION_IDS.items()})
+    tags_section = soup.find_all("a", class_="tag-item")
+    record["Tags"] = ', '.join([tag.text.strip() for tag in tags_section]) if tags_section else "N/A"
+    return record
+
+
+def benchmark(filename="page_source.html", repeats=50):
+    with open(filename, 'r', encoding='utf-8') as f:
+        html = f.read()
+    extractors = {"lxml_single_pass": extract_scheme_page}
+    try:
+        import bs4  # noqa: F401
+        extractors["beautifulsoup"] = _extract_with_beautifulsoup
+    except ImportError:
+        print("beautifulsoup4 not installed; timing only the lxml extractor")
+
+    timings = {}
+    for name, extract in extractors.items():
+        extract(html)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            extract(html)
+        timings[name] = (time.perf_counter() - start) / repeats * 1000
+        print(f"{name}: {timings[name]:.2f} ms/page")
+    if len(timings) == 2:
+        print(f"Speedup: {timings['beautifulsoup'] / timings['lxml_single_pass']:.1f}x")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scheme page extraction")
+    parser.add_argument("pages", nargs="*", default=["page_source.html"])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    for page in args.pages:
+        print(f"== {page} ({len(open(page, 'rb').read()) // 1024} KB)")
+        benchmark(page, args.repeats)
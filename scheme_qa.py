@@ -4,52 +4,275 @@ import faiss
 import json
 import pandas as pd
 import numpy as np
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList
+import time
 import os
 from tqdm import tqdm
 from typing import List, Dict, Any, Tuple
+from chunk_store import ChunkStore, ChunkView
+from shards import IndexShard, ShardedIndex, Hit, write_index, index_is_current
+from crawl_state import content_hash
+from ranking import maximal_marginal_relevance, CrossEncoderReranker
+from metrics import MetricsRegistry, RequestTrace, THROUGHPUT_BUCKETS, TOKEN_BUCKETS
+from query_cache import QueryEmbeddingCache, normalize_query
+from eligibility import EligibilityIndex, parse_profile
+from precompute import AnswerStore
+from stopping import DEFAULT_STOP_STRINGS, INTENT_BUDGETS, classify_intent, adaptive_stopping, stop_reason, trim_response
+
+
+class _TokenTimer(StoppingCriteria):
+    """Never stops generation; records when the first new token appears so
+    prefill and per-token decode time can be told apart."""
+    def __init__(self):
+        self.first_token_time = None
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+        return False
+
 
 class SchemeQASystem:
     def __init__(self, 
                  chunks_file="scheme_chunks.json",
                  processed_data_file="processed_schemes.json",
-                 use_gpu=True):
-        """Initialize the QA system with the processed data"""
+                 use_gpu=True,
+                 diversify=True,
+                 mmr_lambda=0.5,
+                 rerank=False,
+                 rerank_model="cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 rerank_candidates=20,
+                 rerank_top_k=3,
+                 shards=None,
+                 shard_workers=4,
+                 index_dir=None,
+                 load_generator=True,
+                 two_stage=False,
+                 scheme_candidates=10,
+                 query_cache_size=1024,
+                 assisted_decoding=None,
+                 draft_model_id="JackFram/llama-68m",
+                 prompt_lookup_num_tokens=10,
+                 eligibility_filter=False,
+                 answer_store=None,
+                 max_new_tokens=256,
+                 adaptive_length=True,
+                 stop_strings=DEFAULT_STOP_STRINGS):
+        """Initialize the QA system with the processed data
+        
+        With ``rerank`` on, the top ``rerank_candidates`` FAISS hits are rescored
+        by a cross-encoder and only the best ``rerank_top_k`` go into the prompt.
+        
+        ``shards`` maps shard names (e.g. a language or ministry) to chunk files;
+        by default ``chunks_file`` is loaded as a single "default" shard. More
+        shards can be loaded and unloaded later with load_shard/unload_shard.
+        A chunks path may also be a directory written by ChunkStore.save, which
+        is memory-mapped read-only. With ``index_dir`` set, each shard's FAISS
+        index is read from (or saved to) ``<index_dir>/<name>.faiss``.
+        
+        ``load_generator=False`` skips loading the LLM, for retrieval-only use.
+        
+        With ``two_stage`` on, chunk search first picks ``scheme_candidates``
+        schemes from a small scheme-level index and then scores only those
+        schemes' chunks; get_scheme_suggestions reads the scheme index directly.
+        
+        Query embeddings are kept in an LRU of ``query_cache_size`` normalized
+        queries, so repeated queries skip the embedding model (0 disables it).
+        
+        ``assisted_decoding`` speeds up the decode loop: "prompt_lookup" drafts
+        tokens by copying n-gram continuations from the prompt (answers mostly
+        copy spans of the retrieved chunks), "draft_model" drafts them with a
+        small model sharing TinyLlama's tokenizer. TinyLlama verifies every
+        draft, and both modes decode greedily.
+        
+        With ``eligibility_filter`` on, answer_query reads a profile (age,
+        gender, state, income, occupation) from the question and only searches
+        the schemes it is eligible for; a profile can also be passed explicitly.
+        
+        ``answer_store`` (a path or AnswerStore written by precompute.py) is
+        checked by answer_query first, so recurring questions skip generation.
+        
+        With ``adaptive_length`` on, each query gets the token budget and
+        sentence limit of its intent (see stopping.INTENT_BUDGETS, capped at
+        ``max_new_tokens``), and decoding also stops on any of ``stop_strings``
+        or a repeated n-gram.
+        """
+        # Result diversification (maximal marginal relevance)
+        self.diversify = diversify
+        self.mmr_lambda = mmr_lambda
+        
+        # Optional cross-encoder rerank stage, bounded by the candidate budget
+        self.rerank_candidates = rerank_candidates
+        self.rerank_top_k = rerank_top_k
+        
+        # Latency instrumentation, exposed through metrics_text()
+        self.metrics = MetricsRegistry()
+        self.stage_latency = self.metrics.histogram(
+            "scheme_qa_stage_seconds", "Time spent in each stage of the QA path", label_name="stage")
+        self.decode_throughput = self.metrics.histogram(
+            "scheme_qa_decode_tokens_per_second", "Decode throughput of generate_answer",
+            buckets=THROUGHPUT_BUCKETS)
+        self.generated_tokens = self.metrics.histogram(
+            "scheme_qa_generated_tokens", "Tokens generated per answer", buckets=TOKEN_BUCKETS, label_name="intent")
+        self.tokens_saved = self.metrics.counter(
+            "scheme_qa_decode_tokens_saved_total", "Decode tokens not spent compared to max_new_tokens")
+        
+        # Normalized query -> embedding LRU, with hit/miss counters in the metrics
+        self.query_cache = QueryEmbeddingCache(
+            query_cache_size,
+            hit_counter=self.metrics.counter("scheme_qa_query_cache_hits_total", "Query embedding cache hits"),
+            miss_counter=self.metrics.counter("scheme_qa_query_cache_misses_total", "Query embedding cache misses"))
+        
         # Device configuration
         self.device = "cuda" if torch.cuda.is_available() and use_gpu else "cpu"
         print(f"Using device: {self.device}")
         
         # Load the processed data
-        with open(chunks_file, 'r', encoding='utf-8') as f:
-            self.chunks = json.load(f)
         with open(processed_data_file, 'r', encoding='utf-8') as f:
             self.schemes = json.load(f)
         
         # Create scheme lookup by ID
         self.scheme_lookup = {scheme['id']: scheme for scheme in self.schemes}
         
+        # Columnar eligibility attributes for profile pre-filtering
+        self.eligibility_filter = eligibility_filter
+        self.eligibility = EligibilityIndex.from_schemes(self.schemes)
+        
         # Initialize embedding model (small but effective)
         print("Loading embedding model...")
         self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device=self.device)
         
+        # The cross-encoder is small enough to run on CPU in one batched pass
+        self.reranker = None
+        if rerank:
+            print("Loading reranking model...")
+            self.reranker = CrossEncoderReranker(rerank_model, device=self.device)
+        
         # Initialize LLM for generation
-        print("Loading language model...")
-        model_id = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"  # Small but capable model
-        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_id,
-            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-            device_map="auto" if self.device == "cuda" else None
-        )
-        
-        # Build the vector database
-        print("Building vector database...")
-        self._build_vector_db()
-    
-    def _build_vector_db(self):
+        self.tokenizer = None
+        self.model = None
+        if load_generator:
+            print("Loading language model...")
+            model_id = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"  # Small but capable model
+            self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+                device_map="auto" if self.device == "cuda" else None
+            )
+            self.model.eval()
+        
+        # Generation length control
+        self.max_new_tokens = max_new_tokens
+        self.adaptive_length = adaptive_length
+        self.stop_strings = tuple(stop_strings)
+        
+        self.draft_model_id = draft_model_id
+        self.prompt_lookup_num_tokens = prompt_lookup_num_tokens
+        self.draft_model = None
+        self.assisted_decoding = None
+        if load_generator:
+            self.set_assisted_decoding(assisted_decoding)
+        
+        # Build the vector database, one index per shard
+        self.index_dir = index_dir
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        
+        # Scheme-level index for coarse-to-fine search (one vector per scheme)
+        self.two_stage = two_stage
+        self.scheme_candidates = scheme_candidates
+        self.scheme_index = None
+        self.scheme_index_ids = []
+        if two_stage:
+            self._build_scheme_index()
+        
+        self.shards = ShardedIndex(max_workers=shard_workers)
+        for name, shard_chunks_file in (shards or {"default": chunks_file}).items():
+            self.load_shard(name, shard_chunks_file)
+        
+        # Precomputed answers for recurring questions
+        self.answer_store = AnswerStore(answer_store) if isinstance(answer_store, str) else answer_store
+        
+        # Normalized query -> (k, scores, hits) from the last search_queries() batch
+        self._batch_hits = {}
+    
+    def load_shard(self, name: str, chunks_file: str, index_file: str = None, metadata: Dict = None) -> IndexShard:
+        """Load (or replace) a named shard
+        
+        The shard's FAISS index is read from ``index_file`` when it exists and
+        was built from these chunks; otherwise it is built from the chunks and,
+        if ``index_file`` is given, saved there for next time.
+        """
+        chunks = ChunkStore.open(chunks_file)
+        self._batch_hits = {}
+        if index_file is None and self.index_dir:
+            index_file = os.path.join(self.index_dir, f"{name}.faiss")
+        digest = chunks.content_hash()
+        index = self._load_saved_index(index_file, len(chunks), digest)
+        if index is not None:
+            print(f"Loaded vector database for shard '{name}' from {index_file}")
+        else:
+            print(f"Building vector database for shard '{name}'...")
+            index = self._build_vector_db(chunks)
+            if index_file:
+                write_index(index, index_file, digest)
+        shard = IndexShard(name, chunks, index, metadata)
+        self.shards.add(shard)
+        return shard
+    
+    def _build_scheme_index(self):
+        """Embed one summary (name, description, tags) per processed scheme"""
+        self.scheme_index_ids = [scheme['id'] for scheme in self.schemes]
+        summaries = [
+            f"{scheme.get('name', '')}. {scheme.get('description', '')} Tags: {scheme.get('tags', '')}"
+            for scheme in self.schemes
+        ]
+        index_file = os.path.join(self.index_dir, "schemes.faiss") if self.index_dir else None
+        digest = content_hash([self.scheme_index_ids, summaries])
+        self.scheme_index = self._load_saved_index(index_file, len(summaries), digest)
+        if self.scheme_index is not None:
+            print(f"Loaded scheme index from {index_file}")
+            return
+        
+        print("Building scheme index...")
+        embeddings = self.embedding_model.encode(summaries, batch_size=32, convert_to_numpy=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        self.scheme_index = faiss.IndexFlatIP(embeddings.shape[1])
+        self.scheme_index.add(embeddings)
+        if index_file:
+            write_index(self.scheme_index, index_file, digest)
+        print(f"Scheme index built with {len(self.scheme_index_ids)} schemes")
+    
+    def _load_saved_index(self, index_file: str, size: int, digest: str):
+        """Read a saved index, or None if there is none or it was built from other content"""
+        if not index_file or not os.path.exists(index_file):
+            return None
+        index = self._read_index(index_file)
+        if not index_is_current(index, index_file, size, digest):
+            print(f"{index_file} is stale ({index.ntotal} vectors for {size} entries or content changed); rebuilding")
+            return None
+        return index
+    
+    @staticmethod
+    def _read_index(index_file: str):
+        """Read an index memory-mapped where FAISS supports it, in memory otherwise"""
+        try:
+            return faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except (RuntimeError, AttributeError):
+            return faiss.read_index(index_file)
+    
+    def unload_shard(self, name: str):
+        """Drop a shard's chunks and index to free memory"""
+        self._batch_hits = {}
+        if self.shards.remove(name) is None:
+            raise KeyError(f"Shard not loaded: {name}")
+    
+    def _build_vector_db(self, chunks: ChunkStore):
         """Build a FAISS vector database from the chunks"""
         # Generate embeddings for all chunks
-        texts = [chunk['text'] for chunk in self.chunks]
+        texts = list(chunks.texts())
         
         # Process in batches to avoid memory issues
         batch_size = 32
@@ -68,37 +291,253 @@ class SchemeQASystem:
         
         # Create FAISS index
         embedding_dim = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(embedding_dim)  # Inner product for cosine similarity
-        self.index.add(embeddings)
+        index = faiss.IndexFlatIP(embedding_dim)  # Inner product for cosine similarity
+        index.add(embeddings)
+        
+        print(f"Vector database built with {len(chunks)} chunks")
+        return index
+    
+    def metrics_text(self) -> str:
+        """Stage latency histograms in Prometheus text exposition format"""
+        return self.metrics.render()
+    
+    def _trace(self, trace: RequestTrace = None) -> RequestTrace:
+        return trace if trace is not None else RequestTrace(self.stage_latency)
+    
+    def _search(self, query: str, k: int, trace: RequestTrace = None,
+                shards: List[str] = None, scheme_ids: List = None) -> Tuple[np.ndarray, List[Hit]]:
+        """Encode the query and return the scores and hits of the k nearest chunks
+        across the selected shards (all loaded shards by default), optionally
+        only among the chunks of ``scheme_ids``"""
+        trace = self._trace(trace)
+        query_embedding = self._encode_query(query, trace)
+        
+        if scheme_ids is not None:
+            # Already narrowed down (e.g. by eligibility): score only those schemes' chunks
+            with trace.stage("faiss_search"):
+                return self.shards.search(query_embedding, k, shards, scheme_ids=scheme_ids)
+        
+        if self.scheme_index is not None:
+            # Coarse stage: candidate schemes; fine stage: only their chunks
+            with trace.stage("scheme_search"):
+                _, positions = self._search_schemes(query_embedding, self.scheme_candidates)
+                scheme_ids = [self.scheme_index_ids[i] for i in positions]
+            with trace.stage("faiss_search"):
+                return self.shards.search(query_embedding, k, shards, scheme_ids=scheme_ids)
+        
+        batch_hits = self._batch_hits.get(normalize_query(query)) if shards is None else None
+        if batch_hits is not None and k <= batch_hits[0]:
+            # Already searched with its batch: the top k are a prefix of the batch's top hits
+            trace.set("batch_search", True)
+            _, scores, hits = batch_hits
+            return scores[:k], hits[:k]
+        
+        # Fan the search out to the shards and merge their top-k
+        with trace.stage("faiss_search"):
+            return self.shards.search(query_embedding, k, shards)
+    
+    def _encode_query(self, query: str, trace: RequestTrace) -> np.ndarray:
+        """Embed a normalized query, reusing the cached vector when there is one"""
+        key = normalize_query(query)
+        query_embedding = self.query_cache.get(key)
+        if query_embedding is not None:
+            trace.set("query_cache_hit", True)
+            return query_embedding
+        
+        with trace.stage("query_encode"):
+            query_embedding = self.embedding_model.encode(key or query, convert_to_tensor=True)
+            query_embedding = query_embedding.cpu().numpy().reshape(1, -1)
+            faiss.normalize_L2(query_embedding)
+        self.query_cache.put(key, query_embedding)
+        trace.set("query_cache_hit", False)
+        return query_embedding
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed many queries in one batch and cache them, so the retrievals
+        that follow skip the embedding model"""
+        keys = [normalize_query(query) for query in queries]
+        texts = {key: key or query for key, query in zip(keys, queries)}
+        vectors = {}
+        for key in texts:
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                vectors[key] = cached
+        missing = [key for key in texts if key not in vectors]
+        if missing:
+            embeddings = self.embedding_model.encode([texts[key] for key in missing], convert_to_tensor=True)
+            embeddings = embeddings.cpu().numpy()
+            faiss.normalize_L2(embeddings)
+            for key, embedding in zip(missing, embeddings):
+                vectors[key] = embedding.reshape(1, -1)
+                self.query_cache.put(key, vectors[key])
+        return np.vstack([vectors[key] for key in keys])
+    
+    def search_queries(self, queries: List[str], k: int = None) -> List[Tuple[np.ndarray, List[Hit]]]:
+        """Embed and search many queries at once, with one FAISS call per shard
         
-        print(f"Vector database built with {len(self.chunks)} chunks")
+        The hits are kept until the next batch, so unfiltered retrievals and
+        suggestions for these queries that need at most ``k`` hits (by default
+        enough for answer_query) skip their own search.
+        """
+        if k is None:
+            k = max(20, self.rerank_candidates if self.reranker is not None else 0)
+        embeddings = self.encode_queries(queries)
+        results = self.shards.search_batch(embeddings, k)
+        self._batch_hits = {normalize_query(query): (k, scores, hits)
+                            for query, (scores, hits) in zip(queries, results)}
+        return results
+    
+    def _search_schemes(self, query_embedding: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the scheme-level index; returns scores and positions in scheme_index_ids"""
+        scores, indices = self.scheme_index.search(query_embedding, min(k, len(self.scheme_index_ids)) or 1)
+        valid = indices[0] >= 0
+        return scores[0][valid], indices[0][valid]
     
-    def retrieve_relevant_chunks(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Retrieve the most relevant chunks for a query"""
-        # Encode the query
-        query_embedding = self.embedding_model.encode(query, convert_to_tensor=True)
-        query_embedding = query_embedding.cpu().numpy().reshape(1, -1)
-        faiss.normalize_L2(query_embedding)
+    def retrieve_relevant_chunks(self, query: str, top_k: int = 5, diversify: bool = None,
+                                 fetch_k: int = None, trace: RequestTrace = None,
+                                 shards: List[str] = None, scheme_ids: List = None) -> List[ChunkView]:
+        """Retrieve the most relevant chunks for a query
+        
+        With diversification on, ``fetch_k`` candidates are retrieved and the
+        final ``top_k`` are picked with MMR on their stored embeddings, so
+        overlapping chunks of one scheme don't fill every slot.
         
-        # Search for similar chunks
-        scores, indices = self.index.search(query_embedding, top_k)
+        With a reranker configured, ``rerank_candidates`` hits are rescored by
+        the cross-encoder first and the returned scores are its scores.
+        """
+        trace = self._trace(trace)
+        diversify = self.diversify if diversify is None else diversify
+        if self.reranker is not None:
+            fetch_k = fetch_k or max(self.rerank_candidates, top_k)
+        else:
+            fetch_k = fetch_k or (max(top_k * 4, 20) if diversify else top_k)
+        scores, hits = self._search(query, fetch_k, trace, shards, scheme_ids)
         
-        # Get the relevant chunks
+        if self.reranker is not None and hits:
+            with trace.stage("rerank"):
+                rerank_scores = self.reranker.score(query, [ShardedIndex.text(hit) for hit in hits])
+            trace.set("rerank_candidates", len(hits))
+            order = np.argsort(-rerank_scores, kind="stable")
+            scores, hits = rerank_scores[order], [hits[i] for i in order]
+            if diversify and len(hits) > top_k:
+                # MMR needs relevance on the same 0-1 scale as cosine similarity
+                relevance = (scores - scores.min()) / (scores.max() - scores.min() + 1e-9)
+                with trace.stage("mmr"):
+                    order = maximal_marginal_relevance(relevance, ShardedIndex.reconstruct(hits), top_k, self.mmr_lambda)
+                    scores, hits = scores[order], [hits[i] for i in order]
+        elif diversify and len(hits) > top_k:
+            with trace.stage("mmr"):
+                order = maximal_marginal_relevance(scores, ShardedIndex.reconstruct(hits), top_k, self.mmr_lambda)
+                scores, hits = scores[order], [hits[i] for i in order]
+        
+        # Wrap the hits in lightweight views over the shards' chunk stores
         relevant_chunks = [
-            {
-                **self.chunks[idx],
-                "score": float(scores[0][i])
-            }
-            for i, idx in enumerate(indices[0])
+            ShardedIndex.view(hit, float(score))
+            for score, hit in zip(scores[:top_k], hits[:top_k])
         ]
         
         return relevant_chunks
     
-    def generate_answer(self, query: str, top_k: int = 5) -> Tuple[str, List[Dict[str, Any]]]:
-        """Generate an answer to the query using the retrieved chunks"""
+    def generate_answer(self, query: str, top_k: int = None, trace: RequestTrace = None,
+                        shards: List[str] = None, do_sample: bool = True,
+                        scheme_ids: List = None) -> Tuple[str, List[ChunkView]]:
+        """Generate an answer to the query using the retrieved chunks
+        
+        ``top_k`` defaults to 5 chunks, or ``rerank_top_k`` when reranking, since
+        reranked context is precise enough to keep the prompt short.
+        ``do_sample=False`` decodes greedily (always the case in assisted modes).
+        
+        With adaptive length on, the intent's token budget and stopping
+        criteria apply, and the answer is trimmed at the stop string or
+        sentence limit that ended it.
+        """
+        if self.model is None:
+            raise RuntimeError("SchemeQASystem was created with load_generator=False")
+        trace = self._trace(trace)
+        if top_k is None:
+            top_k = self.rerank_top_k if self.reranker is not None else 5
         # Retrieve relevant chunks
-        relevant_chunks = self.retrieve_relevant_chunks(query, top_k)
+        relevant_chunks = self.retrieve_relevant_chunks(query, top_k, trace=trace, shards=shards,
+                                                        scheme_ids=scheme_ids)
+        
+        with trace.stage("prompt_build"):
+            prompt = self._build_prompt(query, relevant_chunks)
+        
+        # Generate response
+        with trace.stage("tokenization"):
+            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+        
+        prompt_tokens = inputs.input_ids.shape[1]
+        intent = classify_intent(query)
+        max_new_tokens, criteria = self.max_new_tokens, []
+        if self.adaptive_length:
+            budget, criteria = adaptive_stopping(self.tokenizer, prompt_tokens, intent, self.stop_strings)
+            max_new_tokens = min(budget, self.max_new_tokens)
+        
+        timer = _TokenTimer()
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model.generate(
+                inputs.input_ids,
+                attention_mask=inputs.attention_mask,
+                max_new_tokens=max_new_tokens,
+                stopping_criteria=StoppingCriteriaList([timer, *criteria]),
+                **self._generation_kwargs(do_sample)
+            )
+        end = time.perf_counter()
         
+        # Prefill runs until the first new token; everything after it is decode
+        new_tokens = outputs.shape[1] - prompt_tokens
+        first_token = timer.first_token_time or end
+        trace.record("prefill", first_token - start)
+        trace.record("decode", end - first_token)
+        trace.set("prompt_tokens", int(prompt_tokens))
+        trace.set("generated_tokens", int(new_tokens))
+        trace.set("assisted_decoding", self.assisted_decoding)
+        trace.set("intent", intent)
+        trace.set("max_new_tokens", max_new_tokens)
+        eos_reached = new_tokens > 0 and outputs[0, -1].item() == self.tokenizer.eos_token_id
+        trace.set("stop_reason", stop_reason(criteria, new_tokens, max_new_tokens, eos_reached))
+        trace.set("tokens_saved", int(self.max_new_tokens - new_tokens))
+        self.generated_tokens.observe(new_tokens, intent)
+        self.tokens_saved.inc(self.max_new_tokens - new_tokens)
+        if new_tokens > 1 and end > first_token:
+            tokens_per_second = (new_tokens - 1) / (end - first_token)
+            self.decode_throughput.observe(tokens_per_second)
+            trace.set("decode_tokens_per_second", round(tokens_per_second, 2))
+        
+        response = self.tokenizer.decode(outputs[0][prompt_tokens:], skip_special_tokens=True)
+        if self.adaptive_length:
+            response = trim_response(response, self.stop_strings, INTENT_BUDGETS[intent][1])
+        
+        # Return the answer and the relevant chunks for transparency
+        return response.strip(), relevant_chunks
+    
+    def set_assisted_decoding(self, mode: str = None):
+        """Switch assisted generation on ("prompt_lookup" / "draft_model") or off (None)"""
+        if mode not in (None, "prompt_lookup", "draft_model"):
+            raise ValueError(f"Unknown assisted decoding mode: {mode}")
+        if mode == "draft_model" and self.draft_model is None:
+            print(f"Loading draft model {self.draft_model_id}...")
+            self.draft_model = AutoModelForCausalLM.from_pretrained(
+                self.draft_model_id,
+                torch_dtype=self.model.dtype
+            ).to(self.model.device)
+            self.draft_model.eval()
+        self.assisted_decoding = mode
+    
+    def _generation_kwargs(self, do_sample: bool = True) -> Dict[str, Any]:
+        """Decoding settings for model.generate, including the assisted mode"""
+        if self.assisted_decoding == "prompt_lookup":
+            return {"do_sample": False, "prompt_lookup_num_tokens": self.prompt_lookup_num_tokens}
+        if self.assisted_decoding == "draft_model":
+            return {"do_sample": False, "assistant_model": self.draft_model}
+        if do_sample:
+            return {"do_sample": True, "temperature": 0.7, "top_p": 0.9}
+        return {"do_sample": False}
+    
+    def _build_prompt(self, query: str, relevant_chunks: List[ChunkView]) -> str:
+        """Build the LLM prompt from the query and retrieved chunks"""
         # Create context from relevant chunks
         context = "\n\n".join([
             f"[Scheme: {chunk['scheme_name']}]\n" +
@@ -107,7 +546,7 @@ class SchemeQASystem:
         ])
         
         # Construct prompt for the LLM
-        prompt = f"""You are a helpful assistant that provides information about Indian government schemes.
+        return f"""You are a helpful assistant that provides information about Indian government schemes.
 Based on the following context, please answer the question accurately and concisely.
 If you don't find relevant information in the context, just say you don't have enough information.
 
@@ -117,40 +556,38 @@ Context:
 Question: {query}
 
 Answer:"""
-        
-        # Generate response
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model.generate(
-                inputs.input_ids,
-                max_new_tokens=256,
-                temperature=0.7,
-                top_p=0.9,
-                do_sample=True
-            )
-        
-        response = self.tokenizer.decode(outputs[0][inputs.input_ids.shape[1]:], skip_special_tokens=True)
-        
-        # Return the answer and the relevant chunks for transparency
-        return response.strip(), relevant_chunks
     
-    def get_scheme_suggestions(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Suggest schemes based on the query"""
-        # Retrieve relevant chunks
-        relevant_chunks = self.retrieve_relevant_chunks(query, top_k=10)
+    def get_scheme_suggestions(self, query: str, top_k: int = 3, diversify: bool = None,
+                               fetch_k: int = 20, trace: RequestTrace = None,
+                               shards: List[str] = None, scheme_ids: List = None) -> List[Dict[str, Any]]:
+        """Suggest schemes based on the query
         
-        # Count schemes that appear in the results
-        scheme_counts = {}
-        for chunk in relevant_chunks:
-            scheme_id = chunk['scheme_id']
-            if scheme_id in scheme_counts:
-                scheme_counts[scheme_id] += chunk['score']
-            else:
-                scheme_counts[scheme_id] = chunk['score']
+        Chunk hits are grouped by scheme. With diversification on, each scheme is
+        represented by the mean of its retrieved chunk embeddings and schemes are
+        picked with MMR, so near-identical variants don't crowd out the rest.
+        
+        When the scheme-level index is built (and no shard or scheme filter is
+        given), schemes are ranked from it directly without touching the chunks.
+        """
+        trace = self._trace(trace)
+        diversify = self.diversify if diversify is None else diversify
         
-        # Get the top schemes
-        top_schemes = sorted(scheme_counts.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        if self.scheme_index is not None and shards is None and scheme_ids is None:
+            query_embedding = self._encode_query(query, trace)
+            with trace.stage("scheme_search"):
+                scores, positions = self._search_schemes(query_embedding, fetch_k if diversify else top_k)
+                scheme_ids = [self.scheme_index_ids[i] for i in positions]
+            with trace.stage("suggestion_aggregation"):
+                if diversify and len(scheme_ids) > top_k:
+                    embeddings = np.vstack([self.scheme_index.reconstruct(int(i)) for i in positions])
+                    order = maximal_marginal_relevance(scores, embeddings, top_k, self.mmr_lambda)
+                    top_schemes = [(scheme_ids[i], float(scores[i])) for i in order]
+                else:
+                    top_schemes = list(zip(scheme_ids, scores.tolist()))[:top_k]
+        else:
+            scores, hits = self._search(query, fetch_k if diversify else 10, trace, shards, scheme_ids)
+            with trace.stage("suggestion_aggregation"):
+                top_schemes = self._aggregate_schemes(scores, hits, top_k, diversify)
         
         # Get the full scheme details
         suggestions = []
@@ -163,21 +600,120 @@ Answer:"""
                     "description": scheme.get('description', ''),
                     "ministries": scheme.get('ministries', ''),
                     "beneficiaries": scheme.get('beneficiaries', ''),
+                    "near_duplicates": scheme.get('near_duplicates', []),
                     "score": float(score)
                 })
         
         return suggestions
+    
+    def _aggregate_schemes(self, scores: np.ndarray, hits: List[Hit], top_k: int,
+                           diversify: bool) -> List[Tuple[Any, float]]:
+        """Group chunk hits by scheme and pick the top schemes"""
+        # Group the retrieved chunks by scheme
+        scheme_counts = {}
+        scheme_members = {}
+        for position, (score, hit) in enumerate(zip(scores, hits)):
+            # A merged duplicate chunk counts for every scheme it stands in for
+            for scheme_id in ShardedIndex.scheme_ids(hit):
+                scheme_counts[scheme_id] = scheme_counts.get(scheme_id, 0.0) + float(score)
+                scheme_members.setdefault(scheme_id, []).append(position)
+        
+        if diversify and len(scheme_counts) > top_k:
+            scheme_ids = list(scheme_members)
+            chunk_embeddings = ShardedIndex.reconstruct(hits)
+            scheme_embeddings = np.vstack([
+                chunk_embeddings[scheme_members[scheme_id]].mean(axis=0)
+                for scheme_id in scheme_ids
+            ])
+            faiss.normalize_L2(scheme_embeddings)
+            # Relevance is the best chunk of each scheme, so long schemes don't win on volume
+            relevance = np.array([scores[scheme_members[scheme_id]].max() for scheme_id in scheme_ids])
+            order = maximal_marginal_relevance(relevance, scheme_embeddings, top_k, self.mmr_lambda)
+            top_schemes = [(scheme_ids[i], float(relevance[i])) for i in order]
+        else:
+            # Get the top schemes
+            top_schemes = sorted(scheme_counts.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        
+        return top_schemes
 
-    def answer_query(self, query: str) -> Dict[str, Any]:
+    def eligible_schemes(self, query: str, profile: Dict[str, Any] = None,
+                         trace: RequestTrace = None) -> List:
+        """Scheme ids the profile (parsed from the query if not given) is eligible for
+        
+        Returns None when there is nothing to filter on, or when no scheme
+        matches, in which case the search runs over the whole catalogue.
+        """
+        trace = self._trace(trace)
+        if profile is None:
+            if not self.eligibility_filter:
+                return None
+            profile = parse_profile(query)
+        if not profile:
+            return None
+        with trace.stage("eligibility_filter"):
+            scheme_ids = self.eligibility.match(profile)
+        trace.set("eligibility_profile", profile)
+        trace.set("eligible_schemes", len(scheme_ids))
+        if not scheme_ids or len(scheme_ids) == len(self.eligibility):
+            return None
+        return scheme_ids
+    
+    def chunk_sources(self, chunks: List[ChunkView]) -> List[Dict[str, Any]]:
+        """Shard, chunk id, scheme and text hash of each chunk, enough to rebuild
+        the views later and to tell whether the chunk has changed since"""
+        stores = {id(self.shards.get(name).chunks): name for name in self.shards.names()}
+        return [{"shard": stores.get(id(chunk._store)), "chunk_id": chunk['chunk_id'],
+                 "scheme_id": chunk['scheme_id'], "text_hash": content_hash(chunk['text']),
+                 "score": chunk.score} for chunk in chunks]
+    
+    def _precomputed_answer(self, query: str, trace: RequestTrace) -> Dict[str, Any]:
+        """The stored answer for a query, or None if there is none or its sources
+        no longer match the loaded chunks (shard missing, chunk id out of range,
+        or the chunk now belongs to another scheme or has different text, e.g.
+        after a re-scrape)"""
+        with trace.stage("answer_store_lookup"):
+            record = self.answer_store.get(query)
+        if record is None or not all(self._source_matches(source) for source in record["sources"]):
+            trace.set("precomputed", False)
+            return None
+        trace.set("precomputed", True)
+        return {
+            "query": query,
+            "answer": record["answer"],
+            "relevant_schemes": record["relevant_schemes"],
+            "chunks_used": [self.shards.get(source["shard"]).chunks.view(source["chunk_id"], source["score"])
+                            for source in record["sources"]],
+            "trace": trace.to_dict()
+        }
+    
+    def _source_matches(self, source: Dict[str, Any]) -> bool:
+        if source["shard"] not in self.shards:
+            return False
+        chunks = self.shards.get(source["shard"]).chunks
+        return (0 <= source["chunk_id"] < len(chunks)
+                and chunks.scheme_field(source["chunk_id"], "scheme_id") == source["scheme_id"]
+                and content_hash(chunks.text(source["chunk_id"])) == source.get("text_hash"))
+    
+    def answer_query(self, query: str, shards: List[str] = None,
+                     profile: Dict[str, Any] = None, do_sample: bool = True) -> Dict[str, Any]:
         """Comprehensive answer to a query with relevant schemes and information"""
-        answer, relevant_chunks = self.generate_answer(query)
-        suggestions = self.get_scheme_suggestions(query)
+        trace = self._trace()
+        # Precomputed answers cover the default, unfiltered path only
+        if self.answer_store is not None and shards is None and profile is None:
+            result = self._precomputed_answer(query, trace)
+            if result is not None:
+                return result
+        scheme_ids = self.eligible_schemes(query, profile, trace)
+        answer, relevant_chunks = self.generate_answer(query, trace=trace, shards=shards, do_sample=do_sample,
+                                                       scheme_ids=scheme_ids)
+        suggestions = self.get_scheme_suggestions(query, trace=trace, shards=shards, scheme_ids=scheme_ids)
         
         return {
             "query": query,
             "answer": answer,
             "relevant_schemes": suggestions,
-            "chunks_used": relevant_chunks
+            "chunks_used": relevant_chunks,
+            "trace": trace.to_dict()
         }
 
 # Example usage
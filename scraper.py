@@ -3,9 +3,13 @@ from bs4 import BeautifulSoup
 import json
 import time
 import pandas as pd
+import os
 import re
+import sys
 from tqdm import tqdm
 
+from crawl_state import CrawlState
+
 class MySchemePortalScraper:
     def __init__(self):
         self.base_url = "https://www.myscheme.gov.in/search"
@@ -16,6 +20,9 @@ class MySchemePortalScraper:
             "Content-Type": "application/json"
         }
         self.schemes = []
+        # Set by an incremental scrape; saved only once the data itself is saved
+        self.crawl_state = None
+        self.manifest_file = None
         
     def get_scheme_ids(self, limit=200):
         """Get IDs of schemes from main listing page"""
@@ -33,13 +40,29 @@ class MySchemePortalScraper:
         data = response.json()
         return [scheme['id'] for scheme in data.get('data', [])]
     
-    def get_scheme_details(self, scheme_id):
-        """Get detailed information for a specific scheme"""
+    def get_scheme_details(self, scheme_id, state=None, conditional=True):
+        """Get detailed information for a specific scheme
+
+        With a CrawlState the request is conditional, and None is returned
+        when the scheme hasn't changed since the last run (304 or same hash).
+        Pass conditional=False when there is no saved copy to fall back on:
+        the content is then always returned, though still recorded in the state.
+        """
         detail_url = f"{self.api_url}/{scheme_id}"
-        response = requests.get(detail_url, headers=self.headers)
+        headers = dict(self.headers)
+        if state is not None and conditional:
+            headers.update(state.conditional_headers(scheme_id))
+        response = requests.get(detail_url, headers=headers)
         
+        if state is not None and response.status_code == 304:
+            state.not_modified(scheme_id)
+            return None
         if response.status_code != 200:
             print(f"Failed to fetch scheme {scheme_id}: {response.status_code}")
+            if state is not None:
+                state.failed(scheme_id)
+            return None
+        if state is not None and not state.check(scheme_id, response.content, response.headers) and conditional:
             return None
             
         return response.json().get('data', {})
@@ -68,8 +91,19 @@ class MySchemePortalScraper:
             
         return scheme
     
-    def scrape(self, limit=150):
-        """Main scraping function"""
+    def scrape(self, limit=150, incremental=False, existing_file="myscheme_data.json",
+               state_file="crawl_state.json", manifest_file="changed_slugs.json"):
+        """Main scraping function
+
+        In incremental mode only schemes that changed since the last run are
+        downloaded and parsed; the rest are carried over from existing_file.
+        The crawl state and the manifest of changed ids (manifest_file) are
+        written by save_to_json, after the data, so a failed save never leaves
+        a state that claims schemes are up to date.
+        """
+        state = CrawlState(state_file) if incremental else None
+        existing = self.load_existing(existing_file) if incremental else {}
+        
         print(f"Fetching schemes from MyScheme portal...")
         scheme_ids = self.get_scheme_ids(limit)
         print(f"Found {len(scheme_ids)} schemes. Getting details...")
@@ -78,20 +112,36 @@ class MySchemePortalScraper:
             # Add delay to avoid rate limiting
             time.sleep(1)
             
-            scheme_data = self.get_scheme_details(scheme_id)
+            # Only ask for a 304 when there is a saved copy to keep
+            scheme_data = self.get_scheme_details(scheme_id, state, conditional=scheme_id in existing)
             parsed_scheme = self.parse_scheme(scheme_data)
             
             if parsed_scheme:
                 self.schemes.append(parsed_scheme)
+            elif scheme_id in existing:
+                # Unchanged (or temporarily failing): keep the last good copy
+                self.schemes.append(existing[scheme_id])
                 
         print(f"Successfully scraped {len(self.schemes)} schemes")
+        self.crawl_state = state
+        self.manifest_file = manifest_file
         return self.schemes
+    
+    def load_existing(self, filename="myscheme_data.json"):
+        """Schemes from a previous run, keyed by id"""
+        if not os.path.exists(filename):
+            return {}
+        with open(filename, 'r', encoding='utf-8') as f:
+            return {scheme['id']: scheme for scheme in json.load(f)}
         
     def save_to_json(self, filename="myscheme_data.json"):
         """Save scraped data to JSON file"""
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(self.schemes, f, ensure_ascii=False, indent=4)
         print(f"Data saved to {filename}")
+        if self.crawl_state is not None:
+            self.crawl_state.save()
+            self.crawl_state.write_manifest(self.manifest_file)
         
     def save_to_csv(self, filename="myscheme_data.csv"):
         """Save scraped data to CSV file"""
@@ -101,6 +151,7 @@ class MySchemePortalScraper:
 
 if __name__ == "__main__":
     scraper = MySchemePortalScraper()
-    schemes = scraper.scrape(limit=150)  # Aiming for more than 100 schemes
+    # Pass --incremental to only re-download schemes that changed since the last run
+    schemes = scraper.scrape(limit=150, incremental="--incremental" in sys.argv)  # Aiming for more than 100 schemes
     scraper.save_to_json()
     scraper.save_to_csv()
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""Pre-fork multi-worker HTTP serving for SchemeQASystem.
+
+The parent process loads the models once, memory-maps the chunk store and
+FAISS index from files written by ``prepare``, then forks the workers. Model
+weights are shared copy-on-write, and the chunk store and index pages are
+shared through the page cache, so extra workers cost far less than extra
+SchemeQASystem instances.
+
+    python serve.py prepare --chunks scheme_chunks.json --processed processed_schemes.json --data-dir serving_data
+    python serve.py serve --data-dir serving_data --workers 4 --port 8000
+
+Endpoints: GET /answer?q=..., GET /metrics (Prometheus text), GET /memory.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict
+from urllib.parse import urlparse, parse_qs
+
+from chunk_store import ChunkStore
+
+
+def memory_usage(pid="self") -> Dict[str, float]:
+    """RSS, PSS and shared memory of a process in MB (Linux /proc)"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["rss_mb"] = int(line.split()[1]) / 1024
+        # PSS splits shared pages between the processes mapping them, so it is
+        # the fair per-worker number; RSS counts shared pages in full
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[f"{key.lower()}_mb"] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage
+
+
+def _store_dir(data_dir):
+    return os.path.join(data_dir, "chunk_store")
+
+
+def _index_dir(data_dir):
+    return os.path.join(data_dir, "indexes")
+
+
+def _processed_file(data_dir):
+    return os.path.join(data_dir, "processed_schemes.json")
+
+
+def prepare(chunks_file, data_dir, processed_data_file="processed_schemes.json"):
+    """Write the memory-mappable chunk store, the processed schemes and the FAISS index for serving"""
+    from scheme_qa import SchemeQASystem
+
+    ChunkStore.from_json(chunks_file).save(_store_dir(data_dir))
+    # Keep a copy with the rest, so data_dir holds everything a worker loads
+    if os.path.abspath(processed_data_file) != os.path.abspath(_processed_file(data_dir)):
+        shutil.copyfile(processed_data_file, _processed_file(data_dir))
+    # Building the index here, not in the serving parent, keeps the parent
+    # from spinning up torch's thread pools before it forks. An index left over
+    # from different chunks fails its content stamp and is rebuilt.
+    SchemeQASystem(chunks_file=_store_dir(data_dir), processed_data_file=_processed_file(data_dir),
+                   index_dir=_index_dir(data_dir), use_gpu=False, load_generator=False)
+
+
+class QARequestHandler(BaseHTTPRequestHandler):
+    qa_system = None
+    answer_store_file = None
+
+    def _send(self, status, body, content_type="application/json"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == "/answer":
+            query = params.get("q", [""])[0].strip()
+            if not query:
+                self._send(400, json.dumps({"error": "missing query parameter 'q'"}))
+                return
+            shards = params.get("shard") or None
+            result = self.qa_system.answer_query(query, shards=shards)
+            result["chunks_used"] = [chunk.to_dict() for chunk in result["chunks_used"]]
+            result["worker_pid"] = os.getpid()
+            self._send(200, json.dumps(result, ensure_ascii=False))
+        elif url.path == "/metrics":
+            lines = [self.qa_system.metrics_text().rstrip("\n"),
+                     "# HELP scheme_qa_worker_memory_megabytes Worker memory usage",
+                     "# TYPE scheme_qa_worker_memory_megabytes gauge"]
+            for key, value in memory_usage().items():
+                lines.append(f'scheme_qa_worker_memory_megabytes{{pid="{os.getpid()}",kind="{key[:-3]}"}} {value}')
+            self._send(200, "\n".join(lines) + "\n", "text/plain; version=0.0.4")
+        elif url.path == "/memory":
+            self._send(200, json.dumps({"pid": os.getpid(), **memory_usage()}))
+        else:
+            self._send(404, json.dumps({"error": "not found"}))
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[worker {os.getpid()}] {format % args}\n")
+
+
+def _run_worker(sock, threads):
+    import torch
+    from precompute import AnswerStore
+    torch.set_num_threads(threads)
+    if QARequestHandler.answer_store_file:
+        QARequestHandler.qa_system.answer_store = AnswerStore(QARequestHandler.answer_store_file)
+    # All workers accept() on the listening socket inherited from the parent
+    server = HTTPServer(sock.getsockname()[:2], QARequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def report_memory(pids):
+    print(f"{'pid':>8} {'rss_mb':>10} {'pss_mb':>10} {'shared_mb':>10}")
+    for pid in pids:
+        usage = memory_usage(pid)
+        shared = usage.get("shared_clean_mb", 0.0) + usage.get("shared_dirty_mb", 0.0)
+        print(f"{pid:>8} {usage.get('rss_mb', 0.0):>10.1f} {usage.get('pss_mb', 0.0):>10.1f} {shared:>10.1f}")
+
+
+def serve(data_dir, workers=2, host="0.0.0.0", port=8000, threads_per_worker=1, report_interval=60,
+          answer_store=None, processed_data_file=None):
+    from scheme_qa import SchemeQASystem
+
+    # Load once in the parent; everything below is inherited by the workers
+    QARequestHandler.qa_system = SchemeQASystem(chunks_file=_store_dir(data_dir),
+                                                processed_data_file=processed_data_file or _processed_file(data_dir),
+                                                index_dir=_index_dir(data_dir), use_gpu=False)
+    if answer_store:
+        # Opened per worker: SQLite connections must not cross a fork
+        QARequestHandler.answer_store_file = answer_store
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers don't write to (and un-share) those pages
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(sock, threads_per_worker)
+        children.append(pid)
+    print(f"Serving on http://{host}:{port} with {workers} workers: {children}")
+
+    def shutdown(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    while True:
+        report_memory(children)
+        time.sleep(report_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker serving for the MyScheme QA system")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = subparsers.add_parser("prepare", help="Write the shared chunk store and index files")
+    prepare_parser.add_argument("--chunks", default="scheme_chunks.json")
+    prepare_parser.add_argument("--processed", default="processed_schemes.json",
+                                help="Processed schemes, copied into the data dir")
+    prepare_parser.add_argument("--data-dir", default="serving_data")
+
+    serve_parser = subparsers.add_parser("serve", help="Start the pre-fork HTTP server")
+    serve_parser.add_argument("--data-dir", default="serving_data")
+    serve_parser.add_argument("--workers", type=int, default=2)
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--threads-per-worker", type=int, default=1)
+    serve_parser.add_argument("--report-interval", type=int, default=60, help="Seconds between RSS reports")
+    serve_parser.add_argument("--answer-store", default=None, help="Precomputed answers from precompute.py")
+    serve_parser.add_argument("--processed", default=None,
+                              help="Processed schemes (default: the copy prepare wrote to the data dir)")
+
+    args = parser.parse_args()
+    if args.command == "prepare":
+        prepare(args.chunks, args.data_dir, args.processed)
+    else:
+        serve(args.data_dir, args.workers, args.host, args.port, args.threads_per_worker, args.report_interval,
+              args.answer_store, args.processed)
+
+
+if __name__ == "__main__":
+    main()
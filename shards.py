@@ -0,0 +1,201 @@
+import gc
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional
+
+import faiss
+import numpy as np
+
+from chunk_store import ChunkStore, ChunkView
+
+
+def write_index(index, filename: str, digest: str):
+    """Save an index next to a stamp of the content it was built from"""
+    faiss.write_index(index, filename)
+    with open(filename + ".sha256", 'w', encoding='utf-8') as f:
+        f.write(digest)
+
+
+def index_is_current(index, filename: str, size: int, digest: str) -> bool:
+    """True if a saved index holds ``size`` vectors built from content with this digest"""
+    stamp = filename + ".sha256"
+    if index.ntotal != size or not os.path.exists(stamp):
+        return False
+    with open(stamp, 'r', encoding='utf-8') as f:
+        return f.read().strip() == digest
+
+
+class IndexShard:
+    """One named slice of the corpus (e.g. a language or ministry) with its own FAISS index"""
+
+    def __init__(self, name: str, chunks: ChunkStore, index, metadata: Dict = None):
+        self.name = name
+        self.chunks = chunks
+        self.index = index
+        self.metadata = metadata or {}
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query_embedding: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search this shard; drops FAISS's -1 padding when k exceeds the shard size"""
+        scores, indices = self.index.search(query_embedding, min(k, len(self.chunks)) or 1)
+        valid = indices[0] >= 0
+        return scores[0][valid], indices[0][valid]
+
+    def search_schemes(self, query_embedding: np.ndarray, k: int, scheme_ids: List,
+                       unfiltered_fraction: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        """Search only the chunks of the given schemes
+
+        When at least ``unfiltered_fraction`` of the shard is eligible, a plain
+        search over-fetched by the eligible share is filtered instead; the ID
+        selector is used when that leaves fewer than k hits.
+        """
+        ids = [self.chunks.chunk_ids_of(scheme_id) for scheme_id in scheme_ids]
+        # A merged duplicate chunk can belong to several of the schemes
+        ids = np.unique(np.concatenate(ids)).astype(np.int64) if ids else np.zeros(0, dtype=np.int64)
+        if not len(ids):
+            return np.zeros(0, dtype=np.float32), ids
+        k = min(k, len(ids))
+        if len(ids) >= unfiltered_fraction * len(self.chunks):
+            scores, indices = self.search(query_embedding, 2 * int(np.ceil(k * len(self.chunks) / len(ids))))
+            eligible = np.isin(indices, ids)
+            if eligible.sum() >= k:
+                return scores[eligible][:k], indices[eligible][:k]
+        selector = faiss.IDSelectorBatch(ids)
+        scores, indices = self.index.search(query_embedding, k, params=faiss.SearchParameters(sel=selector))
+        valid = indices[0] >= 0
+        return scores[0][valid], indices[0][valid]
+
+    def save_index(self, filename: str):
+        write_index(self.index, filename, self.chunks.content_hash())
+
+
+# A search hit: the shard it came from and the chunk's position within that shard
+Hit = Tuple[IndexShard, int]
+
+
+class ShardedIndex:
+    """Named index shards searched in parallel, with results merged by score.
+
+    FAISS releases the GIL while searching, so a small thread pool fans one
+    query out to every selected shard concurrently. Shards can be added and
+    removed independently to keep memory bounded.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._shards: Dict[str, IndexShard] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard-search")
+
+    def add(self, shard: IndexShard):
+        with self._lock:
+            self._shards[shard.name] = shard
+
+    def remove(self, name: str) -> Optional[IndexShard]:
+        with self._lock:
+            shard = self._shards.pop(name, None)
+        gc.collect()
+        return shard
+
+    def get(self, name: str) -> IndexShard:
+        with self._lock:
+            return self._shards[name]
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._shards)
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._shards
+
+    def __len__(self):
+        """Total number of chunks across all loaded shards"""
+        with self._lock:
+            return sum(len(shard) for shard in self._shards.values())
+
+    def _select(self, names: List[str] = None) -> List[IndexShard]:
+        with self._lock:
+            if names is None:
+                return list(self._shards.values())
+            missing = [name for name in names if name not in self._shards]
+            if missing:
+                raise KeyError(f"Shards not loaded: {', '.join(missing)}")
+            return [self._shards[name] for name in names]
+
+    def search(self, query_embedding: np.ndarray, k: int, names: List[str] = None,
+               scheme_ids: List = None) -> Tuple[np.ndarray, List[Hit]]:
+        """Search the selected shards (all by default) and merge their top-k
+
+        With ``scheme_ids`` only the chunks of those schemes are scored, which
+        is the second stage of coarse-to-fine search.
+        """
+        shards = self._select(names)
+        if not shards:
+            return np.zeros(0, dtype=np.float32), []
+        if scheme_ids is None:
+            search, args = IndexShard.search, (query_embedding, k)
+        else:
+            search, args = IndexShard.search_schemes, (query_embedding, k, scheme_ids)
+        if len(shards) == 1:
+            results = [search(shards[0], *args)]
+        else:
+            futures = [self._pool.submit(search, shard, *args) for shard in shards]
+            results = [future.result() for future in futures]
+
+        all_scores = np.concatenate([scores for scores, _ in results])
+        hits = [(shard, int(idx)) for shard, (_, indices) in zip(shards, results) for idx in indices]
+        order = np.argsort(-all_scores, kind="stable")[:k]
+        return all_scores[order], [hits[i] for i in order]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int,
+                     names: List[str] = None) -> List[Tuple[np.ndarray, List[Hit]]]:
+        """Search an (n, d) matrix of queries with one FAISS call per shard;
+        returns what search() would for each query"""
+        shards = self._select(names)
+        if not shards:
+            return [(np.zeros(0, dtype=np.float32), []) for _ in range(len(query_embeddings))]
+        futures = [self._pool.submit(shard.index.search, query_embeddings, min(k, len(shard)) or 1)
+                   for shard in shards]
+        results = [future.result() for future in futures]
+
+        merged = []
+        for row in range(len(query_embeddings)):
+            all_scores, hits = [], []
+            for shard, (scores, indices) in zip(shards, results):
+                # Drop FAISS's -1 padding when k exceeds the shard size
+                valid = indices[row] >= 0
+                all_scores.append(scores[row][valid])
+                hits.extend((shard, int(idx)) for idx in indices[row][valid])
+            all_scores = np.concatenate(all_scores)
+            order = np.argsort(-all_scores, kind="stable")[:k]
+            merged.append((all_scores[order], [hits[i] for i in order]))
+        return merged
+
+    @staticmethod
+    def view(hit: Hit, score: float = None) -> ChunkView:
+        shard, idx = hit
+        return shard.chunks.view(idx, score)
+
+    @staticmethod
+    def text(hit: Hit) -> str:
+        shard, idx = hit
+        return shard.chunks.text(idx)
+
+    @staticmethod
+    def scheme_id(hit: Hit):
+        shard, idx = hit
+        return shard.chunks.scheme_field(idx, 'scheme_id')
+
+    @staticmethod
+    def scheme_ids(hit: Hit) -> List:
+        """The chunk's own scheme followed by the schemes deduplication linked to it"""
+        shard, idx = hit
+        return [shard.chunks.scheme_field(idx, 'scheme_id'), *shard.chunks.linked_scheme_ids(idx)]
+
+    @staticmethod
+    def reconstruct(hits: List[Hit]) -> np.ndarray:
+        """Fetch the stored (normalized) embeddings of already-retrieved chunks"""
+        return np.vstack([shard.index.reconstruct(idx) for shard, idx in hits])
@@ -0,0 +1,183 @@
+"""Adaptive generation length for generate_answer.
+
+TinyLlama tends to run on past the answer: it starts a new "Question:" turn,
+repeats itself, or keeps listing loosely related schemes. Each query gets a
+token budget for its intent (short for "which scheme", long for "how to
+apply"), and decoding stops early on a stop string, a repeated n-gram or once
+the intent's sentence limit is reached.
+"""
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, Tuple
+
+from transformers import StoppingCriteria
+
+from text_resources import sent_tokenize
+
+# Prompt markers the model produces when it starts a new turn on its own
+DEFAULT_STOP_STRINGS = ("Question:", "Context:", "\n\n\n")
+
+# Intent -> (max_new_tokens, max_sentences)
+INTENT_BUDGETS = {
+    "which_scheme": (96, 3),
+    "eligibility": (160, 5),
+    "benefits": (160, 5),
+    "documents": (192, 8),
+    "how_to_apply": (256, 10),
+    "general": (192, 6),
+}
+
+# Checked in order; the first match wins
+_INTENT_PATTERNS = (
+    ("how_to_apply", re.compile(r"\bhow (?:do i|can i|to|should i) (?:apply|register|enrol|enroll|avail)\b"
+                                r"|\bapplication process\b|\bsteps? to\b|\bprocedure\b")),
+    ("documents", re.compile(r"\bdocuments?\b|\bpapers? (?:are )?(?:needed|required)\b")),
+    ("eligibility", re.compile(r"\beligib|\bwho can (?:apply|avail)\b|\bqualif")),
+    ("benefits", re.compile(r"\bbenefits?\b|\bhow much\b|\bamount\b|\bassistance (?:is|do)\b")),
+    ("which_scheme", re.compile(r"\b(?:which|what|any|list)\b.*\bschemes?\b|\bschemes? (?:for|available)\b")),
+)
+
+# A list marker ("1.", "b)", "(iv)") at the end of a sentence; sent_tokenize
+# splits "1. Apply online. 2. Upload ..." into "1.", "Apply online.", "2.", ...
+_ENUMERATOR = re.compile(r"(?:^|\s)\(?(?:\d{1,2}|[A-Za-z]|[ivx]{1,4})[.)]\s*$")
+# The same marker only when it starts its own line ("Steps:\n1."), so a sentence
+# ending in "Class 10." or "Grade A." is never cut
+_LINE_ENUMERATOR = re.compile(r"\n\s*\(?(?:\d{1,2}|[A-Za-z]|[ivx]{1,4})[.)]\s*$")
+
+
+def classify_intent(query: str) -> str:
+    query = query.lower()
+    for intent, pattern in _INTENT_PATTERNS:
+        if pattern.search(query):
+            return intent
+    return "general"
+
+
+def _is_enumerator(sentence: str) -> bool:
+    return not _ENUMERATOR.sub("", sentence).strip()
+
+
+def count_sentences(text: str) -> int:
+    """Sentences in a text, not counting bare list markers"""
+    return sum(1 for sentence in sent_tokenize(text) if not _is_enumerator(sentence))
+
+
+class _GeneratedTextCriterion(StoppingCriteria, ABC):
+    """Base for criteria that look only at the newly generated tokens"""
+
+    reason = None
+
+    def __init__(self, prompt_length: int):
+        self.prompt_length = prompt_length
+        self.triggered = False
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        if not self.triggered and self.check(input_ids[0, self.prompt_length:]):
+            self.triggered = True
+        return self.triggered
+
+    @abstractmethod
+    def check(self, new_tokens) -> bool:
+        """True once the generated tokens should end decoding"""
+
+
+class StopOnStrings(_GeneratedTextCriterion):
+    """Stop once any stop string appears in the last few decoded tokens"""
+
+    reason = "stop_string"
+
+    def __init__(self, tokenizer, prompt_length: int, stop_strings=DEFAULT_STOP_STRINGS, lookback: int = 16):
+        super().__init__(prompt_length)
+        self.tokenizer = tokenizer
+        self.stop_strings = tuple(stop_strings)
+        self.lookback = lookback
+
+    def check(self, new_tokens) -> bool:
+        tail = self.tokenizer.decode(new_tokens[-self.lookback:], skip_special_tokens=True)
+        return any(stop in tail for stop in self.stop_strings)
+
+
+class RepeatedNgramGuard(_GeneratedTextCriterion):
+    """Stop when the latest n-gram has already been generated ``max_repeats`` times"""
+
+    reason = "repeated_ngram"
+
+    def __init__(self, prompt_length: int, ngram_size: int = 6, max_repeats: int = 2):
+        super().__init__(prompt_length)
+        self.ngram_size = ngram_size
+        self.max_repeats = max_repeats
+        self._counts = Counter()
+        self._seen = 0
+
+    def check(self, new_tokens) -> bool:
+        tokens = new_tokens.tolist()
+        # Count only the n-grams ending in tokens added since the last call
+        # (assisted decoding can accept several per step)
+        repeated = False
+        for end in range(max(self._seen, self.ngram_size), len(tokens) + 1):
+            ngram = tuple(tokens[end - self.ngram_size:end])
+            self._counts[ngram] += 1
+            repeated = repeated or self._counts[ngram] > self.max_repeats
+        self._seen = len(tokens) + 1
+        return repeated
+
+
+class SentenceLimit(_GeneratedTextCriterion):
+    """Stop as soon as a sentence beyond ``max_sentences`` starts"""
+
+    reason = "sentence_limit"
+
+    def __init__(self, tokenizer, prompt_length: int, max_sentences: int):
+        super().__init__(prompt_length)
+        self.tokenizer = tokenizer
+        self.max_sentences = max_sentences
+
+    def check(self, new_tokens) -> bool:
+        text = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+        return count_sentences(text) > self.max_sentences
+
+
+def adaptive_stopping(tokenizer, prompt_length: int, intent: str, stop_strings=DEFAULT_STOP_STRINGS,
+                      ngram_size: int = 6, max_repeats: int = 2) -> Tuple[int, List[_GeneratedTextCriterion]]:
+    """Token budget and stopping criteria for one query's intent"""
+    max_new_tokens, max_sentences = INTENT_BUDGETS.get(intent, INTENT_BUDGETS["general"])
+    criteria = [
+        StopOnStrings(tokenizer, prompt_length, stop_strings),
+        RepeatedNgramGuard(prompt_length, ngram_size, max_repeats),
+        SentenceLimit(tokenizer, prompt_length, max_sentences),
+    ]
+    return max_new_tokens, criteria
+
+
+def stop_reason(criteria, new_tokens: int, max_new_tokens: int, eos_reached: bool) -> str:
+    for criterion in criteria:
+        if criterion.triggered:
+            return criterion.reason
+    if eos_reached:
+        return "eos"
+    return "max_new_tokens" if new_tokens >= max_new_tokens else "other"
+
+
+def trim_response(text: str, stop_strings=DEFAULT_STOP_STRINGS, max_sentences: int = None) -> str:
+    """Cut the decoded answer at the first stop string and to at most ``max_sentences``"""
+    for stop in stop_strings:
+        position = text.find(stop)
+        if position >= 0:
+            text = text[:position]
+    if max_sentences and count_sentences(text.strip()) > max_sentences:
+        # Walk the kept sentences through the text so its spacing and newlines survive
+        end = position = 0
+        kept = 0
+        for sentence in sent_tokenize(text.strip()):
+            position = text.find(sentence, position) + len(sentence)
+            if _is_enumerator(sentence):
+                continue
+            kept += 1
+            if kept > max_sentences:
+                break
+            end = position
+        # Don't leave the next item's marker dangling ("... online.\n2.")
+        text = _LINE_ENUMERATOR.sub("", text[:end])
+    return text.strip()
+
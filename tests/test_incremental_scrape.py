@@ -0,0 +1,152 @@
+"""Incremental re-scrapes against a local stub of the MyScheme API"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import scraper as scraper_module
+from crawl_state import CrawlState
+from scraper import MySchemePortalScraper
+
+
+def _scheme(slug, description):
+    return {"id": slug, "name": slug.title(), "description": description,
+            "departments": [], "beneficiaries": [], "tags": []}
+
+
+class StubAPI:
+    """Serves the scheme list and details; answers 304 when If-None-Match matches"""
+
+    def __init__(self):
+        self.schemes = {}
+        self.failing = set()
+        self.honor_etags = True
+        self.requests = {}
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/api/v1/schemes":
+                    body = {"data": [{"id": slug} for slug in api.schemes]}
+                    return self._send(200, body)
+                slug = path.rsplit("/", 1)[-1]
+                api.requests[slug] = dict(self.headers)
+                if slug in api.failing or slug not in api.schemes:
+                    return self._send(500, {})
+                etag = f'"{slug}-{api.schemes[slug]["description"]}"'
+                if api.honor_etags and self.headers.get("If-None-Match") == etag:
+                    return self._send(304, None, etag)
+                return self._send(200, {"data": api.schemes[slug]}, etag)
+
+            def _send(self, status, body, etag=None):
+                payload = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/schemes"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def api():
+    stub = StubAPI()
+    stub.schemes = {"alpha": _scheme("alpha", "first"), "beta": _scheme("beta", "second")}
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    monkeypatch.setattr(scraper_module.time, "sleep", lambda seconds: None)
+
+
+def run(api, tmp_path):
+    scraper = MySchemePortalScraper()
+    scraper.api_url = api.url
+    api.requests.clear()
+    scraper.scrape(limit=10, incremental=True, existing_file=str(tmp_path / "data.json"),
+                   state_file=str(tmp_path / "state.json"), manifest_file=str(tmp_path / "manifest.json"))
+    scraper.save_to_json(str(tmp_path / "data.json"))
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(tmp_path / "data.json", encoding="utf-8") as f:
+        data = {scheme["id"]: scheme for scheme in json.load(f)}
+    return manifest, data
+
+
+def test_first_run_marks_everything_changed(api, tmp_path):
+    manifest, data = run(api, tmp_path)
+    assert sorted(manifest["changed"]) == ["alpha", "beta"]
+    assert set(data) == {"alpha", "beta"}
+    assert "If-None-Match" not in api.requests["alpha"]
+
+
+def test_not_modified_keeps_saved_copy(api, tmp_path):
+    run(api, tmp_path)
+    manifest, data = run(api, tmp_path)
+    assert api.requests["alpha"]["If-None-Match"] == '"alpha-first"'
+    assert sorted(manifest["not_modified"]) == ["alpha", "beta"]
+    assert manifest["changed"] == []
+    assert data["alpha"]["description"] == "first"
+
+
+def test_same_content_without_304_is_unchanged(api, tmp_path):
+    run(api, tmp_path)
+    api.honor_etags = False
+    manifest, data = run(api, tmp_path)
+    assert sorted(manifest["unchanged"]) == ["alpha", "beta"]
+    assert set(data) == {"alpha", "beta"}
+
+
+def test_changed_scheme_is_refetched(api, tmp_path):
+    run(api, tmp_path)
+    api.schemes["beta"] = _scheme("beta", "revised")
+    manifest, data = run(api, tmp_path)
+    assert manifest["changed"] == ["beta"]
+    assert manifest["not_modified"] == ["alpha"]
+    assert data["beta"]["description"] == "revised"
+    assert CrawlState(str(tmp_path / "state.json")).entries["beta"]["etag"] == '"beta-revised"'
+
+
+def test_failed_scheme_keeps_copy_and_is_refetched_next_run(api, tmp_path):
+    run(api, tmp_path)
+    api.failing.add("alpha")
+    manifest, data = run(api, tmp_path)
+    assert manifest["failed"] == ["alpha"]
+    assert data["alpha"]["description"] == "first"
+
+    api.failing.clear()
+    manifest, data = run(api, tmp_path)
+    assert "If-None-Match" not in api.requests["alpha"]
+    assert manifest["changed"] == ["alpha"]
+
+
+def test_scheme_missing_from_saved_data_is_downloaded(api, tmp_path):
+    run(api, tmp_path)
+    with open(tmp_path / "data.json", "w", encoding="utf-8") as f:
+        json.dump([], f)
+    manifest, data = run(api, tmp_path)
+    assert "If-None-Match" not in api.requests["alpha"]
+    assert set(data) == {"alpha", "beta"}
+
+
+def test_state_is_only_saved_with_the_data(api, tmp_path):
+    scraper = MySchemePortalScraper()
+    scraper.api_url = api.url
+    scraper.scrape(limit=10, incremental=True, existing_file=str(tmp_path / "data.json"),
+                   state_file=str(tmp_path / "state.json"), manifest_file=str(tmp_path / "manifest.json"))
+    assert not (tmp_path / "state.json").exists()
+    scraper.save_to_json(str(tmp_path / "data.json"))
+    assert (tmp_path / "state.json").exists()
+    assert (tmp_path / "manifest.json").exists()
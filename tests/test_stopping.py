@@ -0,0 +1,50 @@
+"""Sentence counting and trimming of generated answers"""
+import sys
+import types
+
+import pytest
+
+# stopping.py only needs StoppingCriteria as a base class; stand in for it
+# when transformers (and torch) aren't installed
+try:
+    import transformers  # noqa: F401
+except ImportError:
+    stub = types.ModuleType("transformers")
+    stub.StoppingCriteria = type("StoppingCriteria", (), {})
+    sys.modules["transformers"] = stub
+
+from stopping import count_sentences, trim_response, _GeneratedTextCriterion
+
+NUMBERED = "Steps:\n1. Apply online.\n2. Upload documents.\n3. Visit the office. Then wait."
+
+
+def test_list_markers_are_not_sentences():
+    assert count_sentences(NUMBERED) == 5
+    assert count_sentences("1. Apply online. 2. Upload documents.") == 2
+
+
+def test_trim_numbered_list_drops_dangling_marker():
+    assert trim_response(NUMBERED, max_sentences=2) == "Steps:\n1. Apply online."
+    assert trim_response(NUMBERED, max_sentences=3) == "Steps:\n1. Apply online.\n2. Upload documents."
+    assert trim_response("1. Apply online.\n2. Upload.", max_sentences=1) == "1. Apply online."
+
+
+def test_trim_keeps_sentences_ending_in_numbers_and_letters():
+    text = ("Women aged 18 to 60 can apply. The benefit is paid in 2 installments. "
+            "Applicants must have passed Class 10. It is run by the state. More text here.")
+    assert trim_response(text, max_sentences=3) == (
+        "Women aged 18 to 60 can apply. The benefit is paid in 2 installments. "
+        "Applicants must have passed Class 10.")
+    assert trim_response("Open to those below age 60. Apply now.", max_sentences=1) == "Open to those below age 60."
+    assert (trim_response("It is registered under Section 8. Apply now.", max_sentences=1)
+            == "It is registered under Section 8.")
+
+
+def test_trim_within_limit_and_at_stop_string():
+    assert trim_response(NUMBERED, max_sentences=9) == NUMBERED
+    assert trim_response("Apply online.\nQuestion: what next?", max_sentences=3) == "Apply online."
+
+
+def test_criterion_base_is_abstract():
+    with pytest.raises(TypeError):
+        _GeneratedTextCriterion(0)
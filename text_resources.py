@@ -0,0 +1,110 @@
+"""Bundled text resources so processing runs fully offline.
+
+Replaces the NLTK ``punkt`` sentence tokenizer and ``stopwords`` corpus, which
+had to be downloaded on every import of data_processor.
+"""
+import re
+import subprocess
+import sys
+import time
+from functools import lru_cache
+
+# NLTK's English stopword list (nltk_data/corpora/stopwords/english)
+_ENGLISH_STOPWORDS = """
+i me my myself we our ours ourselves you you're you've you'll you'd your yours
+yourself yourselves he him his himself she she's her hers herself it it's its
+itself they them their theirs themselves what which who whom this that that'll
+these those am is are was were be been being have has had having do does did
+doing a an the and but if or because as until while of at by for with about
+against between into through during before after above below to from up down in
+out on off over under again further then once here there when where why how all
+any both each few more most other some such no nor not only own same so than too
+very s t can will just don don't should should've now d ll m o re ve y ain aren
+aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven
+haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't
+shouldn shouldn't wasn wasn't weren weren't won won't wouldn wouldn't
+"""
+
+# Abbreviations common in scheme text that end in a period but don't end a sentence
+_ABBREVIATIONS = {
+    "dr", "mr", "mrs", "ms", "shri", "smt", "no", "nos", "rs", "govt", "dept",
+    "st", "etc", "e.g", "i.e", "vs", "sr", "jr", "prof", "approx", "viz", "ltd",
+    "pvt", "co", "inc", "fig", "sec", "art", "max", "min",
+}
+
+# Sentence-final punctuation, optional closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r'([.!?]+)(["\')\]]*)\s+')
+_LAST_WORD = re.compile(r'(\S+)$')
+
+
+@lru_cache(maxsize=None)
+def load_stopwords(language="english") -> frozenset:
+    """Return the bundled stopword set (loaded once per process)"""
+    if language != "english":
+        raise ValueError(f"No bundled stopwords for language: {language}")
+    return frozenset(_ENGLISH_STOPWORDS.split())
+
+
+def _is_abbreviation(text_before: str) -> bool:
+    match = _LAST_WORD.search(text_before)
+    if not match:
+        return False
+    word = match.group(1).lower().rstrip(".")
+    # Known abbreviations and single-letter initials ("A. P. J.")
+    return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def sent_tokenize(text: str):
+    """Split text into sentences, punkt-style, without any downloaded model"""
+    if not text:
+        return []
+
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        next_char = text[match.end():match.end() + 1]
+        # A lowercase continuation means the period didn't end the sentence
+        if next_char.islower():
+            continue
+        if match.group(1) == "." and _is_abbreviation(text[start:match.start(1)]):
+            continue
+        sentence = text[start:match.end(2)].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _time_import(statement, repeats=3):
+    """Best wall time of running ``statement`` in a fresh interpreter"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_startup(repeats=3):
+    """Compare start-up cost of the old NLTK-download path with the offline one"""
+    results = {}
+    try:
+        results["nltk_download"] = _time_import(
+            "import nltk; nltk.download('punkt', quiet=True); nltk.download('stopwords', quiet=True); "
+            "from nltk.corpus import stopwords; stopwords.words('english')", repeats)
+    except (subprocess.CalledProcessError, OSError):
+        print("NLTK baseline unavailable (not installed or offline)")
+    results["import_data_processor"] = _time_import("import data_processor", repeats)
+
+    for name, seconds in results.items():
+        print(f"{name}: {seconds * 1000:.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_startup()
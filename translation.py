@@ -0,0 +1,179 @@
+"""Offline translation of answers and scheme cards with a persistent cache.
+
+Uses a small local MarianMT model on CPU. Every field of a response is sent
+in one batched call, texts are split into sentences, and sentences longer
+than ``max_segment_words`` (card fields are cleaned of punctuation, so a
+whole description can be one "sentence") are cut into word windows to stay
+well inside the model's 512-token input. Each translated segment is stored
+in a SQLite cache keyed by a hash of the text. Scheme cards can be precomputed for the whole catalogue:
+
+    python translation.py precompute --processed processed_schemes.json --lang hi
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import List, Dict
+
+from text_resources import sent_tokenize
+
+# Local CPU models per target language
+TRANSLATION_MODELS = {
+    "hi": "Helsinki-NLP/opus-mt-en-hi",
+}
+
+# Scheme card fields shown in the app
+CARD_FIELDS = ("name", "description", "ministries", "beneficiaries")
+
+
+def _cache_key(text: str, target_language: str) -> str:
+    return hashlib.sha256(f"{target_language}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Persistent text-hash -> translation store backed by SQLite"""
+
+    def __init__(self, filename="translation_cache.sqlite"):
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM translations WHERE key IN ({placeholders})", batch)
+                found.update(rows.fetchall())
+        return found
+
+    def put_many(self, items: Dict[str, str]):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO translations (key, value) VALUES (?, ?)",
+                                   list(items.items()))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+class Translator:
+    """Batched, cached English -> target language translation on CPU"""
+
+    def __init__(self, cache: TranslationCache = None, batch_size=16, max_length=512,
+                 max_segment_words=100):
+        self.cache = cache if cache is not None else TranslationCache()
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_segment_words = max_segment_words
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _load(self, target_language):
+        with self._lock:
+            if target_language not in self._models:
+                if target_language not in TRANSLATION_MODELS:
+                    raise ValueError(f"No translation model for language: {target_language}")
+                # Imported lazily so cache-only lookups don't need torch
+                from transformers import MarianMTModel, MarianTokenizer
+                model_id = TRANSLATION_MODELS[target_language]
+                print(f"Loading translation model {model_id}...")
+                tokenizer = MarianTokenizer.from_pretrained(model_id)
+                model = MarianMTModel.from_pretrained(model_id).to("cpu").eval()
+                self._models[target_language] = (tokenizer, model)
+            return self._models[target_language]
+
+    def _segments(self, text: str) -> List[str]:
+        """Sentences of a text, with over-long ones cut into word windows"""
+        segments = []
+        for sentence in sent_tokenize(text) if text else []:
+            words = sentence.split()
+            if len(words) <= self.max_segment_words:
+                segments.append(sentence)
+                continue
+            for i in range(0, len(words), self.max_segment_words):
+                segments.append(" ".join(words[i:i + self.max_segment_words]))
+        return segments
+
+    def _translate_uncached(self, sentences: List[str], target_language: str) -> List[str]:
+        import torch
+
+        tokenizer, model = self._load(target_language)
+        translations = []
+        for i in range(0, len(sentences), self.batch_size):
+            batch = sentences[i:i + self.batch_size]
+            inputs = tokenizer(batch, return_tensors="pt", padding=True, truncation=True,
+                               max_length=self.max_length)
+            with torch.no_grad():
+                outputs = model.generate(**inputs, max_length=self.max_length, num_beams=1)
+            translations.extend(tokenizer.batch_decode(outputs, skip_special_tokens=True))
+        return translations
+
+    def translate_batch(self, texts: List[str], target_language="hi") -> List[str]:
+        """Translate many texts at once; only segments missing from the cache hit the model"""
+        if target_language == "en":
+            return list(texts)
+
+        segmented = [self._segments(text) for text in texts]
+        unique = list(dict.fromkeys(sentence for sentences in segmented for sentence in sentences))
+        keys = {sentence: _cache_key(sentence, target_language) for sentence in unique}
+
+        cached = self.cache.get_many(list(keys.values()))
+        missing = [sentence for sentence in unique if keys[sentence] not in cached]
+        if missing:
+            translated = self._translate_uncached(missing, target_language)
+            new_entries = {keys[sentence]: translation for sentence, translation in zip(missing, translated)}
+            self.cache.put_many(new_entries)
+            cached.update(new_entries)
+
+        return [" ".join(cached[keys[sentence]] for sentence in sentences) for sentences in segmented]
+
+    def translate(self, text: str, target_language="hi") -> str:
+        return self.translate_batch([text], target_language)[0]
+
+    def translate_response(self, answer: str, schemes: List[Dict], target_language="hi"):
+        """Translate an answer and all its scheme cards in one batched call"""
+        texts = [answer] + [scheme.get(field, '') or '' for scheme in schemes for field in CARD_FIELDS]
+        translated = self.translate_batch(texts, target_language)
+        answer = translated[0]
+        cards = []
+        for i, scheme in enumerate(schemes):
+            start = 1 + i * len(CARD_FIELDS)
+            cards.append({**scheme, **dict(zip(CARD_FIELDS, translated[start:start + len(CARD_FIELDS)]))})
+        return answer, cards
+
+    def precompute_scheme_cards(self, schemes: List[Dict], target_language="hi", chunk_size=64):
+        """Fill the cache with card translations for every scheme"""
+        print(f"Precomputing {target_language} scheme cards for {len(schemes)} schemes...")
+        for i in range(0, len(schemes), chunk_size):
+            batch = schemes[i:i + chunk_size]
+            self.translate_batch([scheme.get(field, '') or '' for scheme in batch for field in CARD_FIELDS],
+                                 target_language)
+        print(f"Translation cache now holds {len(self.cache)} entries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline translation utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    precompute = subparsers.add_parser("precompute", help="Translate every scheme card into the cache")
+    precompute.add_argument("--processed", default="processed_schemes.json")
+    precompute.add_argument("--lang", default="hi")
+    precompute.add_argument("--cache", default="translation_cache.sqlite")
+    args = parser.parse_args()
+
+    with open(args.processed, 'r', encoding='utf-8') as f:
+        schemes = json.load(f)
+    Translator(TranslationCache(args.cache)).precompute_scheme_cards(schemes, args.lang)
+
+
+if __name__ == "__main__":
+    main()